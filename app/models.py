@@ -7,9 +7,12 @@ from datetime import datetime
 from app import db
 
 # Association Table
+# artist_id leads the composite primary key, concert_id lookups get an index
 artist_concert = db.Table('artist_concert',
-                          db.Column('concert_id', db.ForeignKey('concert.id')),
-                          db.Column('artist_id', db.ForeignKey('artist.id'))
+                          db.Column('artist_id', db.Integer, db.ForeignKey('artist.id'),
+                                    primary_key=True),
+                          db.Column('concert_id', db.Integer, db.ForeignKey('concert.id'),
+                                    primary_key=True, index=True)
                           )
 
 class Concert(db.Model):
@@ -31,7 +34,7 @@ class Concert(db.Model):
 class Artist(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
-    artist_name = db.Column(db.String(20))
+    artist_name = db.Column(db.String(20), index=True)
     spotify_id = db.Column(db.String(25), unique=True)
     popularity = db.Column(db.Integer)
     followers = db.Column(db.Integer)
@@ -51,7 +54,7 @@ class Track(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     track_id = db.Column(db.String, unique=True)
     track_name = db.Column(db.String, nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'))
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), index=True)
 
     def __repr__(self):
         return f'<Track {self.track_name}>'
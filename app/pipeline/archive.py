@@ -0,0 +1,162 @@
+"""
+    Append-only archive of raw API responses.
+
+    Every response is written as one JSON line, tagged with the run id,
+    timestamp, endpoint and request key, to gzip compressed NDJSON segments.
+    A segment is closed and a new one started once it passes
+    max_segment_bytes. Records are read back lazily, one line at a time,
+    so a run can be audited or replayed without loading whole files.
+"""
+
+import glob
+import gzip
+import json
+import os
+import threading
+import uuid
+import zlib
+from datetime import datetime
+
+from config import base_dir, logger
+
+DEFAULT_ARCHIVE_DIR = os.path.join(base_dir, 'archive')
+
+SEGMENT_SUFFIX = '.ndjson.gz'
+
+
+def new_run_id():
+    """
+        Return a run id that sorts by start time.
+    """
+
+    return f'{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}'
+
+
+class ResponseArchive:
+    """
+        Write API responses to rotating gzip NDJSON segments.
+
+        Safe to share between worker threads. Segments are named
+        <run_id>-<sequence>.ndjson.gz, so a directory listing sorts by run
+        and write order.
+
+        Args:
+            directory: folder holding the segments, created if missing
+            run_id: tag of this run's records, generated if missing
+            max_segment_bytes: compressed size a segment is rotated at
+            compresslevel: gzip level, lower is faster
+    """
+
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR, run_id=None,
+                 max_segment_bytes=64 * 2 ** 20, compresslevel=6):
+
+        self.directory = directory
+        self.run_id = run_id or new_run_id()
+        self.max_segment_bytes = max_segment_bytes
+        self.compresslevel = compresslevel
+
+        self.sequence = 0
+        self.records = 0
+        self.segment_path = None
+        self._raw = None
+        self._segment = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open_segment(self):
+        """
+            Start the next segment of this run.
+        """
+
+        self.sequence += 1
+        self.segment_path = os.path.join(
+            self.directory, f'{self.run_id}-{self.sequence:05d}{SEGMENT_SUFFIX}')
+        self._raw = open(self.segment_path, 'wb')
+        self._segment = gzip.GzipFile(fileobj=self._raw, mode='wb',
+                                      compresslevel=self.compresslevel)
+
+    def close_segment(self):
+
+        if self._segment is not None:
+            self._segment.close()
+            self._raw.close()
+            self._segment = None
+            self._raw = None
+
+    def append(self, endpoint, key, response):
+        """
+            Archive one response.
+
+            Args:
+                endpoint: API endpoint or source name, e.g. 'search'
+                key: request key, e.g. ResponseCache.make_key of the call arguments
+                response: JSON serializable response body
+        """
+
+        record = {'run_id': self.run_id, 'timestamp': datetime.utcnow().isoformat(),
+                  'endpoint': endpoint, 'key': key, 'response': response}
+        line = (json.dumps(record) + '\n').encode('utf-8')
+
+        with self._lock:
+            if self._segment is None:
+                self.open_segment()
+            self._segment.write(line)
+            self.records += 1
+            # compressed bytes written so far, the compressor buffers the rest
+            if self._raw.tell() >= self.max_segment_bytes:
+                self.close_segment()
+
+    def close(self):
+
+        with self._lock:
+            self.close_segment()
+
+
+def segment_paths(directory=DEFAULT_ARCHIVE_DIR, run_id=None):
+    """
+        Return segment paths in run and write order.
+    """
+
+    pattern = f'{run_id}-*{SEGMENT_SUFFIX}' if run_id else f'*{SEGMENT_SUFFIX}'
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def latest_run_id(directory=DEFAULT_ARCHIVE_DIR):
+    """
+        Return run id of the newest segment, or None for an empty archive.
+    """
+
+    paths = segment_paths(directory)
+    if not paths:
+        return None
+
+    return os.path.basename(paths[-1])[:-len(SEGMENT_SUFFIX)].rsplit('-', 1)[0]
+
+
+def iter_records(directory=DEFAULT_ARCHIVE_DIR, run_id=None, endpoint=None):
+    """
+        Yield archived records lazily, oldest first.
+
+        A segment cut short by a crash yields the records before the break.
+
+        Args:
+            run_id: only records of this run
+            endpoint: only records of this endpoint
+    """
+
+    for path in segment_paths(directory, run_id):
+        with gzip.open(path, 'rb') as f:
+            try:
+                for line in f:
+                    record = json.loads(line)
+                    if endpoint is None or record['endpoint'] == endpoint:
+                        yield record
+            except (EOFError, zlib.error, json.JSONDecodeError):
+                logger.warning('Archive segment %s is truncated', path)
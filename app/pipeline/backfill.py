@@ -0,0 +1,182 @@
+"""
+    Historical backfill of concert listings.
+
+    Walks a date range of archived listing pages, fetching them with bounded
+    concurrency and parsing them in a process pool, with a bounded number of
+    pages waiting to be parsed. Finished pages are
+    recorded in a checkpoint file so an interrupted backfill resumes where
+    it stopped.
+"""
+
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, timedelta
+
+from app.pipeline.data_collection import PARSERS, Scraper, start_session
+from app.pipeline.workers import bounded_map
+from config import base_dir, logger
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(base_dir, 'backfill_checkpoint.jsonl')
+
+
+def parse_page(content, page_date, parser='lxml'):
+    """
+        Return concert_dict of an archived page.
+
+        Module level so it can run in a worker process.
+    """
+
+    engine = PARSERS[parser]
+    return engine.parse(engine.event_list(content), reference=page_date)
+
+
+class Checkpoint:
+    """
+        Append-only JSON lines record of finished backfill pages.
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+        self.completed = set()
+
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self.completed.add(json.loads(line)['page'])
+
+    def done(self, page_date):
+        return page_date.isoformat() in self.completed
+
+    def mark(self, page_date, shows=0):
+        """
+            Record page_date as finished.
+        """
+
+        record = {'page': page_date.isoformat(), 'shows': shows,
+                  'completed_at': datetime.utcnow().isoformat()}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self.completed.add(record['page'])
+
+
+class Backfill:
+    """
+        Scrape archived listing pages between start and end.
+
+        Args:
+            start, end: first and last date to cover
+            checkpoint_path: JSON lines file of finished pages
+            scraper: Scraper class whose archive_url is walked
+            session: shared Session, one is started if missing
+            step: days covered by one archive page
+            max_workers: pages fetched at once
+            processes: parser processes, defaults to cpu count
+            max_pending: pages submitted for parsing at once, defaults to
+                twice the parser processes
+            parser: key of PARSERS
+
+        Instance Attributes:
+            concerts: merged concert_dict of pages parsed by this run
+            failed: page dates that could not be fetched or parsed
+    """
+
+    def __init__(self, start, end, checkpoint_path=DEFAULT_CHECKPOINT_PATH,
+                 scraper=Scraper, session=None, step=timedelta(days=7),
+                 max_workers=4, processes=None, max_pending=None, parser='lxml'):
+
+        self.start = start
+        self.end = end
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.scraper = scraper
+        self.session = session or start_session(pool_maxsize=max_workers)
+        self.step = step
+        self.max_workers = max_workers
+        self.processes = processes
+        self.max_pending = max_pending or 2 * (processes or os.cpu_count() or 1)
+        self.parser = parser
+
+        self.concerts = {'concerts': []}
+        self.failed = []
+
+    def pages(self):
+        """
+            Return archive page dates not yet in the checkpoint.
+        """
+
+        pages = []
+        page_date = self.start
+        while page_date <= self.end:
+            if not self.checkpoint.done(page_date):
+                pages.append(page_date)
+            page_date += self.step
+
+        return pages
+
+    def fetch(self, page_date):
+        """
+            Return (page_date, content) of an archive page, content is None on failure.
+        """
+
+        url = self.scraper.archive_url.format(date=page_date)
+        try:
+            response = self.session.get(url)
+            response.raise_for_status()
+            return page_date, response.content
+        except Exception:
+            logger.exception('Backfill fetch failed for %s', url)
+            return page_date, None
+
+    def add_page(self, page_date, concerts):
+        """
+            Default page handler, merges shows into the concerts attribute.
+        """
+
+        self.concerts['concerts'].extend(concerts['concerts'])
+
+    def run(self, on_page=None):
+        """
+            Fetch and parse every pending page.
+
+            on_page(page_date, concert_dict) is called for each parsed page
+            before it is checkpointed, so it should persist the shows.
+        """
+
+        on_page = on_page or self.add_page
+        pending = self.pages()
+        logger.info('Backfill %s to %s: %s pages pending', self.start, self.end, len(pending))
+
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            parsing = {}
+
+            def finish(future):
+                page_date = parsing.pop(future)
+                try:
+                    concerts = future.result()
+                except Exception:
+                    logger.exception('Backfill parse failed for %s', page_date)
+                    self.failed.append(page_date)
+                    return
+                on_page(page_date, concerts)
+                self.checkpoint.mark(page_date, shows=len(concerts['concerts']))
+
+            for page_date, content in bounded_map(self.fetch, pending,
+                                                  max_workers=self.max_workers):
+                if content is None:
+                    self.failed.append(page_date)
+                    continue
+                parsing[pool.submit(parse_page, content, page_date, self.parser)] = page_date
+
+                # stop fetching while the pool is backed up, so downloaded
+                # pages don't pile up in memory faster than they are parsed
+                if len(parsing) >= self.max_pending:
+                    wait(parsing, return_when=FIRST_COMPLETED)
+                for future in [each for each in parsing if each.done()]:
+                    finish(future)
+
+            for future in list(parsing):
+                finish(future)
+
+        return self.concerts
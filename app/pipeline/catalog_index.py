@@ -0,0 +1,120 @@
+"""
+    In-process index of the artist catalog.
+
+    Maps normalized artist names to their Artist id and top track ids, so
+    playlist assembly is a dictionary lookup instead of a query per artist.
+    Built once from the Artist/Track tables and updated with the rows
+    Catalog.load_records inserts.
+"""
+
+import threading
+from collections import defaultdict
+
+from app import db
+from app.models import Artist, Track
+from app.pipeline.matching import normalize_name
+
+
+class CatalogIndex:
+    """
+        Normalized artist name -> artist id and track ids.
+
+        When several artists share a normalized name, the one with the most
+        followers wins, like SpotifyArtistManager.drop_dup_artists.
+
+        Instance Attributes:
+            artist_ids: dict of normalized name -> Artist.id
+            track_ids: dict of Artist.id -> list of Track.track_id
+            built: True once loaded from the database
+    """
+
+    def __init__(self):
+
+        self.artist_ids = {}
+        self.track_ids = defaultdict(list)
+        self.built = False
+
+        self._followers = {}
+        self._lock = threading.Lock()
+
+    def build(self):
+        """
+            Load the whole index from the Artist and Track tables.
+        """
+
+        artists = db.session.query(Artist.id, Artist.artist_name, Artist.followers)
+        tracks = db.session.query(Track.artist_id, Track.track_id)
+
+        with self._lock:
+            self.artist_ids = {}
+            self.track_ids = defaultdict(list)
+            self._followers = {}
+            self._add(artists, tracks)
+            self.built = True
+
+        return self
+
+    def update(self, artists=(), tracks=()):
+        """
+            Add newly loaded rows to a built index.
+
+            Args:
+                artists: iterable of (id, artist_name, followers)
+                tracks: iterable of (artist_id, track_id)
+        """
+
+        if not self.built:
+            # the next lookup loads everything, new rows included
+            return self
+
+        with self._lock:
+            self._add(artists, tracks)
+
+        return self
+
+    def _add(self, artists, tracks):
+
+        for artist_id, artist_name, followers in artists:
+            key = normalize_name(artist_name)
+            followers = followers or 0
+            if key not in self.artist_ids or followers > self._followers[key]:
+                self.artist_ids[key] = artist_id
+                self._followers[key] = followers
+
+        for artist_id, track_id in tracks:
+            self.track_ids[artist_id].append(track_id)
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+        return self
+
+    def lookup(self, name):
+        """
+            Return (artist id, track ids) for an artist name, or None.
+        """
+
+        self.ensure_built()
+        artist_id = self.artist_ids.get(normalize_name(name))
+        if artist_id is None:
+            return None
+
+        return artist_id, list(self.track_ids.get(artist_id, ()))
+
+    def get_track_ids(self, names):
+        """
+            Return track ids of every known artist in names, in name order.
+        """
+
+        self.ensure_built()
+        track_ids = []
+        for name in names:
+            artist_id = self.artist_ids.get(normalize_name(name))
+            if artist_id is not None:
+                track_ids.extend(self.track_ids.get(artist_id, ()))
+
+        return track_ids
+
+
+# Shared by Catalog and Playlist observers
+catalog_index = CatalogIndex()
@@ -2,20 +2,45 @@
     Module for data collection from the web and Spotify API.
 
 """
+import atexit
+import hashlib
+import json
+import os
 import pdb
-from datetime import datetime, timedelta
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import chain
+from datetime import date, datetime, timedelta
 
 import jmespath
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lxml_html
 from requests import Session
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from app import db
 from app.models import Artist, Concert, Track
+from app.pipeline.archive import DEFAULT_ARCHIVE_DIR, ResponseArchive
+from app.pipeline.catalog_index import catalog_index
+from app.pipeline.response_cache import DEFAULT_CACHE_PATH, NegativeCache, ResponseCache
+from app.pipeline.snapshots import export_snapshots
 from app.pipeline.spotify_adapter import SpotipyAdapter
-from config import logger
+from app.pipeline.workers import DEFAULT_MAX_WORKERS
+from config import base_dir, logger
+
+# Keys of each show in a concert_dict
+CONCERT_COLUMNS = ('date_time', 'show_venue', 'show_artists', 'show_info')
+
+# Artist columns loaded from Spotify artist dicts
+ARTIST_COLUMNS = ('artist_name', 'spotify_id', 'popularity', 'followers')
+
+# Folder of per-source Scraper state files written by scrape_sources
+DEFAULT_STATE_DIR = os.path.join(base_dir, 'scraper_state')
 
 class TimeoutHTTPAdapter(HTTPAdapter):
     """
@@ -28,9 +53,12 @@ class TimeoutHTTPAdapter(HTTPAdapter):
 
 
 def start_session(retries=3, backoff_factor=0.3,
-                  status_forcelist=(500, 502, 504)):
+                  status_forcelist=(500, 502, 504), pool_maxsize=DEFAULT_MAX_WORKERS):
     """ Create Session object with user-agent headers, timeout,
-    and retry backoff."""
+    and retry backoff.
+
+    pool_maxsize should be at least the number of worker threads sharing
+    the session, otherwise connections are discarded instead of reused."""
 
     headers = {
         'user-agent': (
@@ -42,59 +70,334 @@ def start_session(retries=3, backoff_factor=0.3,
                   backoff_factor=backoff_factor, status_forcelist=status_forcelist)
 
     with Session() as session:
-        adapter = TimeoutHTTPAdapter(max_retries=retry)
+        adapter = TimeoutHTTPAdapter(max_retries=retry, pool_connections=pool_maxsize,
+                                     pool_maxsize=pool_maxsize)
         session.headers.update(headers)
         session.mount('http:', adapter)
         session.mount('https://', adapter)
         return session
 
 # Strategy Pattern
+# Concert sources by name. Every source scraper emits the concert_dict schema.
+SCRAPERS = {}
 
 
+def register_scraper(name):
+    """
+        Class decorator adding a Scraper subclass to SCRAPERS under name.
+    """
+
+    def register(cls):
+        cls.name = name
+        SCRAPERS[name] = cls
+        return cls
+
+    return register
+
+
+@register_scraper('flagpole')
 class Scraper:
     """
         Behavior:
             Scrape Website
             Create Beautifulsoup object
+            Skip pages and days unchanged since the last run
 
         Data:
             url
+            state_path: JSON file with ETag, Last-Modified and content
+                hashes from previous runs
+
+        Other listing sites subclass Scraper, set url and override
+        get_concerts, then register with register_scraper.
+
+        Pages are appended to archive, a ResponseArchive, when one is set
+        so the run can be replayed offline.
     """
 
-    def __init__(self, session=None):
+    url = 'http://www.flagpole.com/events/live-music'
+    # past listings, formatted with the first day of the archived week
+    archive_url = 'http://www.flagpole.com/events/live-music?date={date:%Y-%m-%d}'
+
+    def __init__(self, session=None, state_path=None, parser='soup', url=None, archive=None):
 
-        self.url = 'http://www.flagpole.com/events/live-music'
+        self.url = url or self.url
         self.session = session
         self.response = None
+        self.archive = archive
+        # key of PARSERS used by get_concerts
+        self.parser = parser
+        # day headings parsed by the last get_concerts, the rest came from state
+        self.parsed_days = set()
+
+        self.state_path = state_path
+        self.state = self.load_state()
+        self.not_modified = False
+
+    def load_state(self):
+        """
+            Return saved conditional request state, keyed by url.
+        """
+
+        if self.state_path is None or not os.path.exists(self.state_path):
+            return {}
+
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def save_state(self):
+        """
+            Persist conditional request state and cached shows.
+
+            Call after get_concerts has returned, scrape_sources does so for
+            every source that succeeded.
+        """
+
+        if self.state_path is None:
+            return
+
+        with open(self.state_path, 'w') as f:
+            json.dump(self.state, f)
 
     def get_response(self):
         """
         Set response attr to response
         returned from URL.
 
+        Sends If-None-Match/If-Modified-Since from the previous run and
+        sets not_modified when the server answers 304. State without cached
+        shows, e.g. written before shows were cached, gets a full fetch.
+
         Args: url string
         """
 
+        page_state = self.state.setdefault(self.url, {})
+        headers = {}
+        # a 304 is only useful if the shows it stands for are cached
+        if 'day_shows' in page_state:
+            if page_state.get('etag'):
+                headers['If-None-Match'] = page_state['etag']
+            if page_state.get('last_modified'):
+                headers['If-Modified-Since'] = page_state['last_modified']
+
         try:
-            self.response = self.session.get(self.url, stream=True)
+            self.response = self.session.get(self.url, headers=headers, stream=True)
             logger.info('Response from %s: \n %s', self.url, self.response)
         except Exception:
             logger.exception("Exception occured", exc_info=True)
+            return
+
+        self.not_modified = self.response.status_code == 304
+        if not self.not_modified:
+            page_state['etag'] = self.response.headers.get('ETag')
+            page_state['last_modified'] = self.response.headers.get('Last-Modified')
+            if self.archive is not None:
+                self.archive_page()
+
+    def archive_page(self):
+        """
+            Append response to archive as a 'page' record keyed by url.
+        """
+
+        encoding = self.response.encoding or 'utf-8'
+        self.archive.append('page', self.url, {
+            'status_code': self.response.status_code,
+            'headers': dict(self.response.headers),
+            'encoding': encoding,
+            'text': self.response.content.decode(encoding, errors='replace')})
 
     def get_concerts(self):
         """
+            Return concert_dict of every show on the page.
+
+            Days unchanged since the last run come from the shows cached in
+            state, only changed days are parsed again. parsed_days holds the
+            day headings parsed by this call.
         """
-        content = self.response.content
-        soup = BeautifulSoup(content, 'lxml')
-        return parse_soup(soup)
 
+        page_state = self.state.setdefault(self.url, {})
+        self.parsed_days = set()
+
+        if self.not_modified:
+            logger.info('%s not modified, skipping parse', self.url)
+            return cached_concerts(page_state)
+
+        parser = PARSERS[self.parser]
+        event_list = parser.event_list(self.response.content)
+
+        content_hash = fingerprint(parser.serialize(event_list))
+        if content_hash == page_state.get('content_hash') and 'day_shows' in page_state:
+            logger.info('%s event list unchanged, skipping parse', self.url)
+            return cached_concerts(page_state)
+
+        day_hashes = {day: fingerprint(block)
+                      for day, block in parser.day_blocks(event_list)}
+        previous = page_state.get('day_hashes', {})
+        cached = page_state.get('day_shows', {})
+        self.parsed_days = {day for day, day_hash in day_hashes.items()
+                            if previous.get(day) != day_hash or day not in cached}
 
-def parse_soup(soup):
+        parsed = {}
+        for show in parser.parse(event_list, days=self.parsed_days)['concerts']:
+            parsed.setdefault(show['date_time'], []).append(
+                dict(show, date_time=show['date_time'].isoformat()))
+
+        # page order, days no longer on the page are dropped
+        day_shows = {day: parsed.get(parse_show_date(day), []) if day in self.parsed_days
+                     else cached[day] for day in day_hashes}
+
+        page_state['content_hash'] = content_hash
+        page_state['day_hashes'] = day_hashes
+        page_state['day_shows'] = day_shows
+
+        return cached_concerts(page_state)
+
+
+def cached_concerts(page_state):
+    """
+        Return concert_dict of the shows cached in a page's scraper state.
+    """
+
+    concerts = [dict(show, date_time=datetime.strptime(show['date_time'], '%Y-%m-%dT%H:%M:%S'))
+                for shows in page_state.get('day_shows', {}).values() for show in shows]
+
+    return {'concerts': concerts}
+
+
+def scrape_sources(session=None, sources=None, max_workers=DEFAULT_MAX_WORKERS,
+                   timeout=60, options=None, state_dir=DEFAULT_STATE_DIR,
+                   archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+        Run source scrapers concurrently and merge their concerts.
+
+        A source that raises or is still running after timeout seconds is
+        reported and left out, the other sources are still merged.
+
+        Args:
+            session: shared pooled Session, one is started if missing
+            sources: names in SCRAPERS, defaults to all of them
+            max_workers: sources scraped at once
+            timeout: seconds to wait for all sources
+            options: dict of source name -> Scraper keyword arguments
+            state_dir: folder of <source>.json state files, None scrapes
+                every source from scratch without saving state
+            archive_dir: folder the fetched pages are archived to, in the
+                same run as get_spotify's responses, None archives nothing
+
+        Returns:
+            concert_dict with every show tagged by its source,
+            report: list of dicts with source, seconds, shows, error and scraper
+    """
+
+    sources = list(sources or SCRAPERS)
+    options = options or {}
+    session = session or start_session(pool_maxsize=max(len(sources), 1))
+    if state_dir is not None:
+        os.makedirs(state_dir, exist_ok=True)
+    archive = get_archive(archive_dir) if archive_dir is not None else None
+
+    def run(name):
+        result = {'source': name, 'seconds': None, 'shows': 0,
+                  'error': None, 'scraper': None, 'concerts': None}
+        start = time.perf_counter()
+        try:
+            kwargs = dict(options.get(name, {}))
+            if state_dir is not None:
+                kwargs.setdefault('state_path', os.path.join(state_dir, f'{name}.json'))
+            if archive is not None:
+                kwargs.setdefault('archive', archive)
+            scraper = SCRAPERS[name](session=session, **kwargs)
+            result['scraper'] = scraper
+            scraper.get_response()
+            result['concerts'] = scraper.get_concerts()
+            scraper.save_state()
+        except Exception as e:
+            logger.exception('Scraper %s failed', name)
+            result['error'] = e
+        result['seconds'] = time.perf_counter() - start
+
+        return result
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources) or 1)))
+    futures = [executor.submit(run, name) for name in sources]
+    wait(futures, timeout=timeout)
+    # don't block the run on sources that are still going
+    executor.shutdown(wait=False)
+
+    concert_dict = {'concerts': []}
+    report = []
+    for name, future in zip(sources, futures):
+        if not future.done():
+            future.cancel()
+            logger.error('Scraper %s timed out after %ss', name, timeout)
+            report.append({'source': name, 'seconds': timeout, 'shows': 0,
+                           'error': TimeoutError(name), 'scraper': None})
+            continue
+
+        result = future.result()
+        concerts = result.pop('concerts') or {'concerts': []}
+        for show in concerts['concerts']:
+            show['source'] = name
+        concert_dict['concerts'].extend(concerts['concerts'])
+        result['shows'] = len(concerts['concerts'])
+        logger.info('Scraper %s: %s shows in %.2fs', name, result['shows'], result['seconds'])
+        report.append(result)
+
+    return concert_dict, report
+
+
+def fingerprint(text):
+    """
+        Return sha256 hex digest of text.
+    """
+
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def day_blocks(event_list):
+    """
+        Yield (day heading, day html) for each day in the event list.
+    """
+
+    if event_list is None:
+        return
+
+    for event in event_list.findAll('h2'):
+        yield event.text, str(event) + str(event.findNext('ul'))
+
+
+def parse_show_date(heading, reference=None):
+    """
+        Return datetime of a day heading like 'Friday, May 10'.
+
+        Headings carry no year, it is taken from reference (default today).
+        Listings only run a few months ahead, so a January heading on a
+        December page belongs to the next year. 'February 29' outside a leap
+        year is placed in the adjacent leap year.
+    """
+
+    reference = reference or date.today()
+    # parse in a leap year so February 29 is valid before the year is chosen
+    show_date = datetime.strptime(f'{heading} 2000', '%A, %B %d %Y')
+    year = reference.year + 1 if show_date.month < reference.month - 6 else reference.year
+
+    for candidate in (year, year + 1, year - 1):
+        try:
+            return show_date.replace(year=candidate)
+        except ValueError:
+            continue
+
+    raise ValueError(f'{heading!r} is not a date near {reference}')
+
+
+def parse_soup(soup, days=None, reference=None):
     """
         Return dictionary of upcoming shows in Athens, Ga.
 
         Args:
             self.concert_soup
+            days: day headings to parse, defaults to every day
+            reference: date of the page, used for the year of each show
 
         Return:
             concert: dict
@@ -102,14 +405,23 @@ def parse_soup(soup):
                 and Show information.
     """
 
-    events = soup.find(class_='event-list').findAll('h2')
+    return parse_event_list(soup.find(class_='event-list'), days=days, reference=reference)
+
+
+def parse_event_list(event_list, days=None, reference=None):
+    """
+        Return concert_dict from the event-list Tag of a BeautifulSoup tree.
+    """
+
+    events = event_list.findAll('h2') if event_list is not None else []
     concert_dict = {}
     concert_dict['concerts'] = []
 
     for event in events:
         concert_date = event.text
-        concert_date = fr'{concert_date} {date.today().year}'
-        concert_datetime = datetime.strptime(concert_date, '%A, %B %d %Y')
+        if days is not None and concert_date not in days:
+            continue
+        concert_datetime = parse_show_date(concert_date, reference=reference)
         # TODO: use in testing for Data Audit
         # event_count = event.findNext('p')
         venues = event.findNext('ul').findAll('h4')
@@ -124,7 +436,8 @@ def parse_soup(soup):
                           'show_venue': venue.text,
                           'show_artists': names, 'show_info': info.text
                           })
-            concert_dict['concerts'].extend(shows)
+
+        concert_dict['concerts'].extend(shows)
 
     # TODO: add ability to log range of concert dates
     # logger.info('Concerts found for these dates)
@@ -133,17 +446,130 @@ def parse_soup(soup):
     return concert_dict
 
 
+def parse_lxml(event_list, days=None, reference=None):
+    """
+        Return concert_dict from the event-list element of an lxml tree.
+
+        Walks the h2 (day) and h4 (venue) headings in a single forward pass
+        instead of searching the document again for every venue.
+    """
+
+    concert_dict = {}
+    concert_dict['concerts'] = []
+    if event_list is None:
+        return concert_dict
+
+    concert_datetime = None
+    for heading in event_list.iter('h2', 'h4'):
+
+        if heading.tag == 'h2':
+            concert_date = heading.text_content()
+            if days is not None and concert_date not in days:
+                concert_datetime = None
+                continue
+            concert_datetime = parse_show_date(concert_date, reference=reference)
+            continue
+
+        if concert_datetime is None:
+            continue
+
+        info = next(heading.itersiblings('p'), None)
+        if info is None:
+            # same lookup as findNext('p') when the info isn't a sibling
+            info = next(iter(LxmlParser.next_p_xpath(heading)), None)
+        if info is None:
+            continue
+        names = []
+        for band in info.itersiblings():
+            strong = next(band.iter('strong'), None)
+            if strong is not None:
+                names.append(strong.text_content().replace('\xa0', ''))
+
+        concert_dict['concerts'].append({'date_time': concert_datetime,
+                                         'show_venue': heading.text_content(),
+                                         'show_artists': names,
+                                         'show_info': info.text_content()
+                                         })
+
+    return concert_dict
+
+
+class SoupParser:
+    """
+        BeautifulSoup engine, builds a tree of the whole page.
+    """
+
+    @staticmethod
+    def event_list(content):
+        return BeautifulSoup(content, 'lxml').find(class_='event-list')
+
+    @staticmethod
+    def serialize(event_list):
+        return str(event_list)
+
+    day_blocks = staticmethod(day_blocks)
+    parse = staticmethod(parse_event_list)
+
+
+class LxmlParser:
+    """
+        lxml engine, finds the event-list with XPath and parses it in one pass.
+    """
+
+    event_list_xpath = etree.XPath(
+        '//*[contains(concat(" ", normalize-space(@class), " "), " event-list ")][1]')
+    next_ul_xpath = etree.XPath('following::ul[1]')
+    next_p_xpath = etree.XPath('following::p[1]')
+
+    @classmethod
+    def event_list(cls, content):
+        found = cls.event_list_xpath(lxml_html.fromstring(content))
+        return found[0] if found else None
+
+    @staticmethod
+    def serialize(event_list):
+        if event_list is None:
+            return 'None'
+        return etree.tostring(event_list, encoding='unicode', with_tail=False)
+
+    @classmethod
+    def day_blocks(cls, event_list):
+        if event_list is None:
+            return
+
+        for event in event_list.iter('h2'):
+            block = cls.serialize(event) + ''.join(
+                cls.serialize(each) for each in cls.next_ul_xpath(event))
+            yield event.text_content(), block
+
+    parse = staticmethod(parse_lxml)
+
+
+# Parser engines selectable with Scraper(parser=...)
+PARSERS = {'soup': SoupParser, 'lxml': LxmlParser}
+
+
 class ConcertManager:
     """
     Gets Artist data from web scraper
+
+    artist_df holds one row per (show, artist), built once per scrape with
+    normalized names stored as a Categorical. Both frames are sorted and
+    indexed by date_time so schedule windows are binary-search slices.
     """
 
     def __init__(self, concerts=None):
         self.observers = []
         self.concerts = concerts  # for catalog - don't care about schedule
         self.df = pd.DataFrame(self.concerts['concerts'])
-
-        self.artists = self.get_artists(self.df)
+        if self.df.empty:
+            self.df = pd.DataFrame(columns=CONCERT_COLUMNS)
+        self.df['date_time'] = pd.to_datetime(self.df['date_time'])
+        self.df = (self.df.sort_values('date_time', kind='mergesort')
+                   .set_index('date_time', drop=False))
+
+        self.artist_df = self.explode_artists(self.df)
+        self.artists = self.get_artists(self.artist_df)
         self.weekly_artists = None
 
     def attach(self, observer):
@@ -156,14 +582,51 @@ class ConcertManager:
         """
 
         _, week_end = self.get_week_range()
-        df = self.df.copy()
-        self.weekly_artists = (df[lambda x: x['date_time']]
-                               .apply(pd.Timestamp)
-                               [lambda x: x['date_time'] < week_end]
-                               .pipe(self.get_artists))
+        self.weekly_artists = self.get_schedule(end=week_end)
 
         self.update_observers()
 
+    @staticmethod
+    def window_slice(index, start=None, end=None):
+        """
+            Return slice of a sorted DatetimeIndex covering [start, end).
+        """
+
+        lo = index.searchsorted(pd.Timestamp(start), side='left') if start is not None else 0
+        hi = index.searchsorted(pd.Timestamp(end), side='left') if end is not None else len(index)
+
+        return slice(lo, hi)
+
+    def get_shows(self, start=None, end=None):
+        """
+            Return concert rows with date_time in [start, end).
+        """
+
+        return self.df.iloc[self.window_slice(self.df.index, start, end)]
+
+    def get_schedule(self, start=None, end=None):
+        """
+            Return artists playing in [start, end), open ended if either is None.
+        """
+
+        artist_df = self.artist_df
+        return self.get_artists(artist_df.iloc[self.window_slice(artist_df.index, start, end)])
+
+    def get_schedules(self, windows=None):
+        """
+            Return dict of window name -> artists.
+
+            Args:
+                windows: dict of name -> (start, end), defaults to
+                    this_week and next_weekend
+        """
+
+        if windows is None:
+            windows = {'this_week': self.get_week_range(),
+                       'next_weekend': self.get_weekend_range()}
+
+        return {name: self.get_schedule(start, end) for name, (start, end) in windows.items()}
+
     def update_observers(self):
         for observer in self.observers:
             observer()
@@ -183,14 +646,57 @@ class ConcertManager:
         return week_start, week_end
 
     @staticmethod
-    def get_artists(df):
+    def get_weekend_range(today=None):
+        """
+            Return start and end of the coming weekend, Friday to Monday.
+
+            During a weekend this is the current weekend.
+        """
+
+        today = datetime.combine(today or date.today(), datetime.min.time())
+        # Friday is weekday 4, Saturday/Sunday count back to the current Friday
+        days_to_friday = 4 - today.weekday() if today.weekday() <= 4 else -(today.weekday() - 4)
+        weekend_start = today + timedelta(days=days_to_friday)
+
+        return weekend_start, weekend_start + timedelta(days=3)
+
+    @staticmethod
+    def explode_artists(df):
+        """
+            Return DataFrame with one row per show artist.
+
+            Columns:
+                date_time: show date, repeated for each artist
+                artist_name: name with case and whitespace folded, Categorical in
+                    order of appearance
+        """
 
-        df = df.copy()
-        artists = [i.lower()
-                   for i in df['show_artists'].tolist()
-                   for j in i]
+        lengths = df['show_artists'].str.len().fillna(0).astype(int).values
+        names = pd.Series(list(chain.from_iterable(df['show_artists'].dropna())),
+                          dtype=object)
+        # names stay searchable as scraped, lookups normalize_name them later
+        names = (names.str.replace('\xa0', ' ', regex=False)
+                 .str.replace(r'\s+', ' ', regex=True)
+                 .str.strip()
+                 .str.lower())
+
+        artist_df = pd.DataFrame({
+            'date_time': pd.to_datetime(np.repeat(df['date_time'].values, lengths)),
+            'artist_name': names.values})
+        artist_df = artist_df[artist_df['artist_name'] != '']
+        artist_df['artist_name'] = pd.Categorical(
+            artist_df['artist_name'], categories=pd.unique(artist_df['artist_name']))
+
+        # df is already sorted by date_time, so the index is too
+        return artist_df.set_index('date_time', drop=False)
 
-        return artists
+    @staticmethod
+    def get_artists(artist_df):
+        """
+            Return unique artist names in order of appearance.
+        """
+
+        return artist_df['artist_name'].drop_duplicates().tolist()
 
 class Playlist:
     """
@@ -198,22 +704,31 @@ class Playlist:
         ConcertManager Observer
     """
 
-    def __init__(self, concert_manager=None):
+    def __init__(self, concert_manager=None, catalog=None):
         self.concert_manager = concert_manager
-        self.catalog = None
+        # CatalogIndex, built from the database on first use
+        self.catalog = catalog if catalog is not None else catalog_index
         self.artists = None
+        self.track_ids = None
 
     def __call__(self):
         self.update_playlist()
 
     def update_playlist(self):
         self.artists = self.concert_manager.weekly_artists
+        self.query_catalog()
+
+    def query_catalog(self, artists=None):
+        """
+            Set track_ids attribute to the catalog tracks of artists.
 
-    def query_catalog(self):
-        pass
+            Pure in-memory lookup against the catalog index.
+        """
+
+        artists = artists if artists is not None else self.artists
+        self.track_ids = self.catalog.get_track_ids(artists or [])
 
-        # query catalog for artist names
-        # get track_ids
+        return self.track_ids
 
 class Catalog:
     """
@@ -223,9 +738,18 @@ class Catalog:
     """
 
 # add all
-    def __init__(self, concert_manager=None):
+    def __init__(self, concert_manager=None, chunk_size=500, index=None, spotify=None,
+                 snapshot_dir=None):
 
         self.concert_manager = concert_manager
+        # rows per IN query and per bulk insert
+        self.chunk_size = chunk_size
+        # CatalogIndex kept in sync with committed rows
+        self.index = index if index is not None else catalog_index
+        # SpotipyAdapter, the module client unless one is injected
+        self.spotify = spotify
+        # Parquet snapshots are exported here after each load when set
+        self.snapshot_dir = snapshot_dir
 
         self.artists = None
 
@@ -235,57 +759,168 @@ class Catalog:
         """
 
         self.artists = self.concert_manager.artists
-        spotify.get_catalog_data(self.artists)
+        self.adapter.get_catalog_data(self.artists)
+
+    @property
+    def adapter(self):
+        """
+            SpotipyAdapter catalog data is read from.
+        """
+
+        return self.spotify if self.spotify is not None else get_spotify()
+
+    def chunks(self, values):
+        """
+            Yield chunk_size slices of values.
+        """
+
+        for i in range(0, len(values), self.chunk_size):
+            yield values[i:i + self.chunk_size]
+
+    def id_map(self, column, values):
+        """
+            Return dict of column value -> primary key for rows already in the database.
+        """
+
+        model = column.class_
+        ids = {}
+        for chunk in self.chunks(values):
+            ids.update((value, pk) for pk, value in
+                       db.session.query(model.id, column).filter(column.in_(chunk)))
+
+        return ids
+
+    def bulk_insert(self, model, rows):
+        """
+            Insert rows with core executemany inserts, chunk_size rows at a time.
+        """
+
+        for chunk in self.chunks(rows):
+            db.session.execute(model.__table__.insert(), chunk)
 
     def load_records(self):
         """
             Load Artist records into Database. 
+
+            Existing spotify_id/track_id values are looked up with one IN query
+            per chunk and only the missing rows are bulk inserted, all in a
+            single transaction.
         """
 
         triage = []
+        adapter = self.adapter
+
+        assert len(adapter.artist_data) == len(adapter.track_data)
 
-        assert len(spotify.artist_data) == len(spotify.track_data)
-     
-        for artist, tracks in zip(spotify.artist_data, spotify.track_data):
-
-            try:
-                artist_exists = (db
-                                .session.query(Artist.id)
-                                .filter_by(spotify_id=artist['spotify_id']).scalar() is not None)
-                # pdb.set_trace()
-                if not artist_exists:
-                    artist_rec = Artist(**artist)
-                    db.session.add(artist_rec)
-
-                for track in tracks:
-                    track_exists = (db
-                                    .session.query(Track.id)
-                                    .filter_by(track_id=track['track_id']).scalar() is not None)
-                                    
-                    if not track_exists:
-                            track_rec = Track(**track, artist=artist_rec)
-                            db.session.add(track_rec)
-                    
-            except Exception as e:
-                
-                # log exception
-                # add to triage table
-                # Fails with UnboundLocalError
-                triage.append({'artist': artist, 'track': track, 'Error': e})
-                raise
+        try:
+            artists = {}
+            for artist in adapter.artist_data:
+                artists.setdefault(artist['spotify_id'],
+                                   {col: artist.get(col) for col in ARTIST_COLUMNS})
+
+            artist_ids = self.id_map(Artist.spotify_id, list(artists))
+            new_artists = [each for spotify_id, each in artists.items()
+                           if spotify_id not in artist_ids]
+            self.bulk_insert(Artist, new_artists)
+
+            # primary keys of the rows just inserted
+            artist_ids.update(self.id_map(Artist.spotify_id,
+                                          [each['spotify_id'] for each in new_artists]))
+
+            tracks = {}
+            for artist, artist_tracks in zip(adapter.artist_data, adapter.track_data):
+                for track in artist_tracks:
+                    tracks.setdefault(track['track_id'],
+                                      {'track_id': track['track_id'],
+                                       'track_name': track['track_name'],
+                                       'artist_id': artist_ids[artist['spotify_id']]})
+
+            track_ids = self.id_map(Track.track_id, list(tracks))
+            new_tracks = [each for track_id, each in tracks.items()
+                          if track_id not in track_ids]
+            self.bulk_insert(Track, new_tracks)
+
+        except Exception as e:
+
+            # log exception
+            # add to triage table
+            db.session.rollback()
+            triage.append({'Error': e})
+            raise
 
         db.session.commit()
+        logger.info('Loaded %s new artists and %s new tracks',
+                    len(new_artists), len(new_tracks))
+
+        self.index.update(
+            artists=[(artist_ids[each['spotify_id']], each['artist_name'], each['followers'])
+                     for each in new_artists],
+            tracks=[(each['artist_id'], each['track_id']) for each in new_tracks])
+
+        if self.snapshot_dir is not None:
+            export_snapshots(self.snapshot_dir)
 
-        # pdb.set_trace()
         return triage
 
-def create_spotify():
+def create_spotify(cache_path=DEFAULT_CACHE_PATH, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+        Return an authenticated SpotipyAdapter.
+
+        Responses are cached in cache_path, names without search results
+        are remembered in the same file, and every response is archived to
+        archive_dir for replay.pipeline. None turns either off.
+    """
 
     session = start_session()
-    spotify = SpotipyAdapter(session=session).authenticate_user()
+    cache = negative_cache = archive = None
+    if cache_path is not None:
+        cache = ResponseCache(path=cache_path)
+        negative_cache = NegativeCache(path=cache_path)
+    if archive_dir is not None:
+        archive = get_archive(archive_dir)
+
+    spotify = SpotipyAdapter(session=session, cache=cache, negative_cache=negative_cache,
+                             archive=archive).authenticate_user()
     return spotify
 
-spotify = create_spotify()
+# ResponseArchive of this process per folder, created by get_archive so the
+# scraped pages and Spotify responses of a run share one run id
+archives = {}
+_archive_lock = threading.Lock()
+
+
+def get_archive(directory=DEFAULT_ARCHIVE_DIR):
+    """
+        Return the ResponseArchive of this process writing to directory.
+
+        The archive is closed at exit so its last segment is complete.
+    """
+
+    with _archive_lock:
+        if directory not in archives:
+            archives[directory] = ResponseArchive(directory=directory)
+            atexit.register(archives[directory].close)
+
+        return archives[directory]
+
+# Module SpotipyAdapter, created by get_spotify on first use so importing this
+# module never opens a session or prompts for authentication
+spotify = None
+_spotify_lock = threading.Lock()
+
+
+def get_spotify():
+    """
+        Return the module SpotipyAdapter, authenticating it on first call.
+    """
+
+    global spotify
+    if spotify is None:
+        with _spotify_lock:
+            if spotify is None:
+                spotify = create_spotify()
+
+    return spotify
 
     # def load_new_artists(self):
     #     """
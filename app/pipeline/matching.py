@@ -0,0 +1,131 @@
+"""
+    Artist name normalization and matching.
+
+    Scraped listings and Spotify results spell the same band differently:
+    case, accents, punctuation, a leading "The", stray non-breaking spaces
+    and repeated whitespace. Names are normalized before being used as
+    lookup keys, and NameIndex matches near misses through a trigram
+    candidate index.
+"""
+
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+_WHITESPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_LEADING_THE = re.compile(r'^the\s+')
+
+# Bumped whenever normalize_name changes, so keys stored by an older
+# version can be found and rekeyed. Version 1 only folded case and spaces.
+NORMALIZER_VERSION = 2
+
+
+def normalize_name(name):
+    """
+        Return lookup key for an artist name.
+
+        'The Drive-By Truckers\xa0' and 'drive by truckers' share a key.
+    """
+
+    if name is None:
+        return ''
+
+    name = unicodedata.normalize('NFKD', name.replace('\xa0', ' '))
+    name = ''.join(each for each in name if not unicodedata.combining(each)).lower()
+    name = _PUNCTUATION.sub(' ', name.replace('&', ' and '))
+    name = _WHITESPACE.sub(' ', name).strip()
+
+    return _LEADING_THE.sub('', name)
+
+
+def trigrams(key):
+    """
+        Return set of character trigrams of a normalized key.
+    """
+
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(grams, other):
+    """
+        Return Dice coefficient of two trigram sets.
+    """
+
+    if not grams or not other:
+        return 0.0
+
+    return 2 * len(grams & other) / (len(grams) + len(other))
+
+
+class NameIndex:
+    """
+        Index of artist names for exact and fuzzy matching.
+
+        Exact normalized keys match with confidence 1.0. Other names are
+        compared only against candidates sharing trigrams, and match if
+        their Dice similarity is at least threshold.
+
+        Args:
+            names: iterable of names to index
+            threshold: lowest similarity reported as a match
+            max_candidates: candidates scored per query
+    """
+
+    def __init__(self, names=(), threshold=0.8, max_candidates=10):
+
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+
+        self.names = []
+        self.exact = {}
+        self.grams = []
+        self.postings = defaultdict(list)
+
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        """
+            Index name, names with an already indexed key are ignored.
+        """
+
+        key = normalize_name(name)
+        if not key or key in self.exact:
+            return
+
+        position = len(self.names)
+        self.names.append(name)
+        self.exact[key] = position
+        grams = trigrams(key)
+        self.grams.append(grams)
+        for gram in grams:
+            self.postings[gram].append(position)
+
+    def match(self, name):
+        """
+            Return (indexed name, confidence) of the best match, or (None, 0.0).
+        """
+
+        key = normalize_name(name)
+        if key in self.exact:
+            return self.names[self.exact[key]], 1.0
+
+        grams = trigrams(key)
+        shared = Counter(position for gram in grams
+                         for position in self.postings.get(gram, ()))
+
+        best, confidence = None, 0.0
+        for position, _ in shared.most_common(self.max_candidates):
+            score = similarity(grams, self.grams[position])
+            if score > confidence:
+                best, confidence = position, score
+
+        if best is None or confidence < self.threshold:
+            return None, confidence
+
+        return self.names[best], confidence
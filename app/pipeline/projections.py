@@ -0,0 +1,74 @@
+"""
+    Precompiled jmespath projections of Spotify API responses.
+
+    Expressions are compiled once at import instead of being parsed by
+    jmespath.search on every call. The helpers take a single response, so
+    a response can be projected as soon as it arrives and the raw payload
+    dropped.
+"""
+
+import jmespath
+
+# Search endpoint
+ARTIST_ITEMS = jmespath.compile('artists.items')
+ARTIST_IDS = jmespath.compile('artists.items[].id')
+ARTIST_INFO = jmespath.compile(
+    'artists.items[].{artist_name: name, genres: genres, spotify_id: id,'
+    'popularity: popularity, followers: followers.total}')
+
+# Several Artists endpoint
+SEVERAL_ARTISTS = jmespath.compile('artists')
+ARTIST_STATS = jmespath.compile(
+    '[].{spotify_id: id, popularity: popularity, followers: followers.total}')
+
+# Artist Top Tracks endpoint
+TRACK_INFO = jmespath.compile('tracks[*].{track_id: id, track_name: name}')
+
+
+def has_artists(response):
+    """
+        Return True if a search response found any artist.
+    """
+
+    return bool(ARTIST_ITEMS.search(response))
+
+
+def project_artists(response):
+    """
+        Return artist dicts of a search response.
+    """
+
+    return ARTIST_INFO.search(response) or []
+
+
+def project_artist_ids(response):
+    """
+        Return spotify ids of a search response.
+    """
+
+    return ARTIST_IDS.search(response) or []
+
+
+def project_tracks(response):
+    """
+        Return track dicts of a top tracks response.
+    """
+
+    return TRACK_INFO.search(response) or []
+
+
+def project_several_artists(response):
+    """
+        Return artist objects of a several artists response, unknown ids dropped.
+    """
+
+    return [artist for artist in SEVERAL_ARTISTS.search(response) or []
+            if artist is not None]
+
+
+def project_artist_stats(artists):
+    """
+        Return spotify_id, popularity and followers of artist objects.
+    """
+
+    return ARTIST_STATS.search(artists) or []
@@ -0,0 +1,187 @@
+"""
+    Offline replay of archived pipeline runs.
+
+    Reruns Scraper -> ConcertManager -> SpotipyAdapter.get_catalog_data ->
+    Catalog.load_records with every HTTP call served from a ResponseArchive
+    run: listing pages through ReplaySession and Spotify responses through
+    ReplaySpotify. Nothing touches the network and calls are not rate
+    limited, so history can be reprocessed after parser fixes and the
+    transform and load stages timed on their own.
+"""
+
+import time
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from app.pipeline.archive import DEFAULT_ARCHIVE_DIR, iter_records, latest_run_id
+from app.pipeline.data_collection import (SCRAPERS, Catalog, ConcertManager,
+                                          scrape_sources)
+from app.pipeline.response_cache import ResponseCache
+from app.pipeline.scheduler import RequestScheduler
+from app.pipeline.spotify_adapter import SEARCHED_ARTISTS, SpotipyAdapter
+from config import logger
+
+
+class ReplayMiss(KeyError):
+    """
+        Raised when a replayed call has no archived response.
+    """
+
+
+def load_run(directory=DEFAULT_ARCHIVE_DIR, run_id=None):
+    """
+        Read an archived run in one pass.
+
+        Returns:
+            run_id,
+            pages: dict of url -> page payload,
+            responses: dict of (endpoint, key) -> Spotify response,
+            searched: artist names the live run searched, None if not archived
+    """
+
+    run_id = run_id or latest_run_id(directory)
+    if run_id is None:
+        raise ReplayMiss(f'No archived runs in {directory}')
+
+    pages = {}
+    responses = {}
+    searched = None
+    for record in iter_records(directory, run_id=run_id):
+        if record['endpoint'] == 'page':
+            pages[record['key']] = record['response']
+        elif record['endpoint'] == SEARCHED_ARTISTS:
+            searched = (searched or []) + record['response']
+        else:
+            responses[record['endpoint'], record['key']] = record['response']
+
+    return run_id, pages, responses, searched
+
+
+class ReplaySession:
+    """
+        Stand-in for requests.Session serving archived pages by url.
+
+        Conditional request headers are ignored, every page is a 200 so the
+        scraper parses it in full.
+    """
+
+    def __init__(self, pages):
+
+        self.pages = pages
+        self.hooks = {'response': []}
+
+    def get(self, url, headers=None, **kwargs):
+
+        if url not in self.pages:
+            raise ReplayMiss(f'No archived page for {url}')
+
+        page = self.pages[url]
+        response = Response()
+        response.url = url
+        response.status_code = page['status_code']
+        response.headers = CaseInsensitiveDict(page['headers'])
+        response.encoding = page['encoding']
+        response._content = page['text'].encode(page['encoding'])
+
+        return response
+
+
+class ReplaySpotify:
+    """
+        Stand-in for spotipy.Spotify serving archived responses.
+
+        Any method call is looked up by method name and the same request key
+        SpotifyArtistManager.call archived it under.
+    """
+
+    def __init__(self, responses):
+
+        self.responses = responses
+        self.calls = 0
+
+    def __getattr__(self, endpoint):
+
+        if endpoint.startswith('_'):
+            raise AttributeError(endpoint)
+
+        def replay(*args, **kwargs):
+            key = ResponseCache.make_key(*args, **kwargs)
+            try:
+                response = self.responses[endpoint, key]
+            except KeyError:
+                raise ReplayMiss(f'No archived {endpoint} response for {key}') from None
+            self.calls += 1
+            return response
+
+        return replay
+
+
+class UnlimitedScheduler(RequestScheduler):
+    """
+        RequestScheduler that only counts calls, replayed calls never wait.
+    """
+
+    def acquire(self):
+
+        with self._cond:
+            self.calls += 1
+
+
+def replay_pipeline(directory=DEFAULT_ARCHIVE_DIR, run_id=None, sources=None, parser='lxml',
+                    load=True, projection_only=True, max_workers=1):
+    """
+        Rerun an archived run end to end without network access.
+
+        Args:
+            directory: ResponseArchive folder
+            run_id: run to replay, defaults to the newest
+            sources: SCRAPERS names, defaults to every source with an archived page
+            parser: key of PARSERS the pages are parsed with
+            load: run Catalog.load_records, needs an app context
+            projection_only: SpotipyAdapter ingestion mode
+            max_workers: worker threads, one avoids thread overhead on CPU bound replays
+
+        Returns:
+            dict with run_id, concerts, report, concert_mgr, adapter, catalog and
+            seconds spent in each stage
+    """
+
+    run_id, pages, responses, searched = load_run(directory, run_id)
+    if sources is None:
+        sources = [name for name, scraper in SCRAPERS.items() if scraper.url in pages]
+
+    seconds = {}
+    start = time.perf_counter()
+    concerts, report = scrape_sources(session=ReplaySession(pages), sources=sources,
+                                      max_workers=max_workers, state_dir=None, archive_dir=None,
+                                      options={name: {'parser': parser} for name in sources})
+    seconds['scrape'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    concert_mgr = ConcertManager(concerts=concerts)
+    seconds['concerts'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    adapter = SpotipyAdapter(max_workers=max_workers, scheduler=UnlimitedScheduler(),
+                             playlist_cache_path=None, projection_only=projection_only)
+    adapter.spotify = ReplaySpotify(responses)
+    # the live run may have skipped negative-cache hits or unchanged days,
+    # search the names it searched rather than every scraped artist
+    adapter.get_catalog_data(searched if searched is not None else concert_mgr.artists)
+    seconds['catalog_data'] = time.perf_counter() - start
+
+    catalog = Catalog(concert_manager=concert_mgr, spotify=adapter)
+    catalog.artists = concert_mgr.artists
+    if load:
+        start = time.perf_counter()
+        catalog.load_records()
+        seconds['load'] = time.perf_counter() - start
+
+    logger.info('Replayed run %s: %s shows, %s Spotify calls, %s', run_id,
+                len(concerts['concerts']), adapter.spotify.calls,
+                ', '.join(f'{stage} {each:.2f}s' for stage, each in seconds.items()))
+
+    return {'run_id': run_id, 'concerts': concerts, 'report': report,
+            'concert_mgr': concert_mgr, 'adapter': adapter, 'catalog': catalog,
+            'seconds': seconds}
@@ -0,0 +1,336 @@
+"""
+    Persistent cache for Spotify API responses.
+
+    Responses are stored as JSON in a local SQLite file, keyed by endpoint and
+    the query arguments. Every endpoint has its own time to live and the cache
+    evicts least recently used rows once it holds more than max_entries.
+
+    NegativeCache remembers artist names Spotify returned nothing for, so
+    repeat misses are not searched again until their back-off expires.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from app.pipeline.matching import NORMALIZER_VERSION, normalize_name
+from config import base_dir, logger
+
+DAY = 24 * 60 * 60
+
+DEFAULT_CACHE_PATH = os.path.join(base_dir, 'spotify_cache.sqlite')
+
+# Seconds each endpoint's responses stay fresh
+DEFAULT_TTL = {
+    'search': 7 * DAY,
+    'artist_top_tracks': 7 * DAY,
+    'artists': DAY,
+}
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """
+        SQLite backed response cache with per-endpoint TTL.
+
+        Args:
+            path: SQLite file, ':memory:' for a throwaway cache
+            ttl: dict of endpoint -> seconds, merged over DEFAULT_TTL
+            max_entries: rows kept before least recently used rows are evicted
+
+        Instance Attributes:
+            hits: Counter of cache hits per endpoint
+            misses: Counter of cache misses per endpoint
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=None, max_entries=50000):
+
+        self.path = str(path)
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.max_entries = max_entries
+
+        self.hits = Counter()
+        self.misses = Counter()
+
+        # one connection shared by the pipeline's worker threads
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                endpoint TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (endpoint, key)
+            );
+            CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at
+                ON response_cache (accessed_at);
+        """)
+        self._size = self._conn.execute(
+            'SELECT COUNT(*) FROM response_cache').fetchone()[0]
+
+    @staticmethod
+    def make_key(*args, **kwargs):
+        """
+            Return a stable string key for a call's arguments.
+        """
+
+        return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    def get(self, endpoint, key, default=None):
+        """
+            Return cached response or default if missing or expired.
+        """
+
+        now = time.time()
+        ttl = self.ttl.get(endpoint, 0)
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created_at FROM response_cache WHERE endpoint = ? AND key = ?',
+                (endpoint, key)).fetchone()
+
+            if row is None or now - row[1] > ttl:
+                self.misses[endpoint] += 1
+                return default
+
+            self._conn.execute(
+                'UPDATE response_cache SET accessed_at = ? WHERE endpoint = ? AND key = ?',
+                (now, endpoint, key))
+            self._conn.commit()
+            self.hits[endpoint] += 1
+
+        return json.loads(row[0])
+
+    def set(self, endpoint, key, value):
+        """
+            Store response, evicting old rows if the cache is full.
+        """
+
+        now = time.time()
+
+        with self._lock:
+            exists = self._conn.execute(
+                'SELECT 1 FROM response_cache WHERE endpoint = ? AND key = ?',
+                (endpoint, key)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)',
+                (endpoint, key, json.dumps(value), now, now))
+            self._conn.commit()
+
+            if not exists:
+                self._size += 1
+            if self._size > self.max_entries:
+                self.evict()
+
+    def cached(self, endpoint, func, *args, **kwargs):
+        """
+            Return func(*args, **kwargs), served from the cache when fresh.
+        """
+
+        if not self.ttl.get(endpoint):
+            return func(*args, **kwargs)
+
+        key = self.make_key(*args, **kwargs)
+        value = self.get(endpoint, key, default=_MISSING)
+        if value is _MISSING:
+            value = func(*args, **kwargs)
+            if value is not None:
+                self.set(endpoint, key, value)
+
+        return value
+
+    def evict(self, target=None):
+        """
+            Delete expired rows, then least recently used rows down to target.
+        """
+
+        target = int(self.max_entries * 0.9) if target is None else target
+
+        with self._lock:
+            self.expire()
+            self._size = self._conn.execute(
+                'SELECT COUNT(*) FROM response_cache').fetchone()[0]
+            excess = self._size - target
+            if excess > 0:
+                self._conn.execute(
+                    'DELETE FROM response_cache WHERE rowid IN ('
+                    'SELECT rowid FROM response_cache ORDER BY accessed_at LIMIT ?)',
+                    (excess,))
+                self._size = target
+                logger.info('Evicted %s responses from %s', excess, self.path)
+            self._conn.commit()
+
+    def expire(self):
+        """
+            Delete rows older than their endpoint's TTL.
+        """
+
+        now = time.time()
+
+        with self._lock:
+            endpoints = [each for each, in self._conn.execute(
+                'SELECT DISTINCT endpoint FROM response_cache')]
+            for endpoint in endpoints:
+                self._conn.execute(
+                    'DELETE FROM response_cache WHERE endpoint = ? AND created_at < ?',
+                    (endpoint, now - self.ttl.get(endpoint, 0)))
+            self._conn.commit()
+
+    def stats(self):
+        """
+            Return hit/miss counters and current size.
+        """
+
+        return {'hits': dict(self.hits), 'misses': dict(self.misses),
+                'size': self._size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class NegativeCache:
+    """
+        SQLite backed cache of artist names with no Spotify search results.
+
+        Each repeated miss doubles the time before the name is searched
+        again, starting at base_ttl and capped at max_ttl. Rows are keyed by
+        normalize_name and tagged with NORMALIZER_VERSION, rows of an older
+        version are rekeyed when the cache is opened.
+
+        Args:
+            path: SQLite file, can be shared with ResponseCache
+            base_ttl: seconds to skip a name after its first miss
+            max_ttl: longest back-off in seconds
+
+        Instance Attributes:
+            skipped: number of searches avoided
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, base_ttl=7 * DAY, max_ttl=90 * DAY):
+
+        self.path = str(path)
+        self.base_ttl = base_ttl
+        self.max_ttl = max_ttl
+
+        self.skipped = 0
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS negative_cache (
+                name TEXT PRIMARY KEY,
+                misses INTEGER NOT NULL,
+                checked_at REAL NOT NULL,
+                retry_at REAL NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(negative_cache)')]
+        if 'version' not in columns:
+            # caches written before keys were versioned hold version 1 keys
+            self._conn.execute(
+                'ALTER TABLE negative_cache ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+        self._conn.commit()
+        self.migrate()
+
+    def migrate(self):
+        """
+            Rekey rows stored by an older normalize_name.
+
+            Every normalizer version refines the one before, so normalizing
+            an old key gives the current key. Rows that collapse onto one key
+            keep the most misses and the latest re-check.
+
+            Returns:
+                number of rows rekeyed
+        """
+
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT name, misses, checked_at, retry_at FROM negative_cache '
+                'WHERE version != ?', (NORMALIZER_VERSION,)).fetchall()
+            if not rows:
+                return 0
+
+            self._conn.execute('DELETE FROM negative_cache WHERE version != ?',
+                               (NORMALIZER_VERSION,))
+            merged = {}
+            for name, *values in rows:
+                key = normalize_name(name)
+                current = merged.get(key) or self._conn.execute(
+                    'SELECT misses, checked_at, retry_at FROM negative_cache WHERE name = ?',
+                    (key,)).fetchone()
+                merged[key] = values if current is None else list(map(max, current, values))
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO negative_cache VALUES (?, ?, ?, ?, ?)',
+                [(key, *values, NORMALIZER_VERSION) for key, values in merged.items() if key])
+            self._conn.commit()
+
+        logger.info('Rekeyed %s negative cache rows to normalizer version %s',
+                    len(rows), NORMALIZER_VERSION)
+        return len(rows)
+
+    def is_known_miss(self, name):
+        """
+            Return True if name missed recently and its back-off has not expired.
+        """
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT retry_at FROM negative_cache WHERE name = ?',
+                (normalize_name(name),)).fetchone()
+
+            if row is not None and row[0] > time.time():
+                self.skipped += 1
+                return True
+
+        return False
+
+    def record_miss(self, name):
+        """
+            Record an empty search result and push back the next re-check.
+        """
+
+        key = normalize_name(name)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT misses FROM negative_cache WHERE name = ?', (key,)).fetchone()
+            misses = 1 if row is None else row[0] + 1
+            ttl = min(self.base_ttl * 2 ** (misses - 1), self.max_ttl)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO negative_cache VALUES (?, ?, ?, ?, ?)',
+                (key, misses, now, now + ttl, NORMALIZER_VERSION))
+            self._conn.commit()
+
+    def record_hit(self, name):
+        """
+            Forget a name once Spotify knows it.
+        """
+
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM negative_cache WHERE name = ?', (normalize_name(name),))
+            self._conn.commit()
+
+    def stats(self):
+        """
+            Return skipped searches and number of names cached.
+        """
+
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM negative_cache').fetchone()[0]
+
+        return {'skipped': self.skipped, 'size': size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
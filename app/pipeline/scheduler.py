@@ -0,0 +1,197 @@
+"""
+    Rate limited scheduling of Spotify API calls.
+
+    Every spotipy call made by the artist and playlist managers goes through a
+    RequestScheduler. It hands out tokens from a token bucket and, once Spotify
+    answers 429 Too Many Requests, pauses every worker until Retry-After has
+    passed instead of letting each thread hammer the API on its own.
+"""
+
+import functools
+import threading
+import time
+
+from config import logger
+
+
+class RequestScheduler:
+    """
+        Token bucket rate limiter shared by all worker threads.
+
+        Args:
+            rate: tokens added per second
+            burst: bucket size, defaults to rate
+            max_retries: times a call is retried after a 429
+            default_retry_after: pause in seconds when 429 has no Retry-After
+
+        Instance Attributes:
+            calls: calls started
+            rate_limited: 429 responses seen
+            queue_depth: callers currently waiting for a token
+            max_queue_depth: highest queue_depth seen
+            throttle_time: total seconds callers spent waiting
+    """
+
+    def __init__(self, rate=10.0, burst=None, max_retries=3, default_retry_after=1.0):
+
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.throttle_time = 0.0
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        # per thread flag, set once response_hook paused for the current call
+        self._local = threading.local()
+
+    def acquire(self):
+        """
+            Block until a token is available and no global pause is active.
+        """
+
+        with self._cond:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            start = time.monotonic()
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        self._cond.wait(self._paused_until - now)
+                        continue
+
+                    self._tokens = min(self.capacity,
+                                       self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.calls += 1
+                        return
+
+                    self._cond.wait((1 - self._tokens) / self.rate)
+            finally:
+                self.queue_depth -= 1
+                self.throttle_time += time.monotonic() - start
+
+    def pause(self, seconds):
+        """
+            Stop handing out tokens to every caller for seconds.
+        """
+
+        with self._cond:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # bucket restarts empty so callers don't burst right after the pause
+            self._tokens = 0
+            self._updated = self._paused_until
+            self._cond.notify_all()
+
+        logger.warning('Spotify rate limit hit, pausing requests for %ss', seconds)
+
+    def retry_after(self, headers):
+        """
+            Return seconds to wait from a Retry-After header.
+        """
+
+        try:
+            return max(float((headers or {}).get('Retry-After')), 0)
+        except (TypeError, ValueError):
+            return self.default_retry_after
+
+    def call(self, func, *args, **kwargs):
+        """
+            Call func once a token is available, retrying after 429 responses.
+        """
+
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            self._local.hook_paused = False
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                # spotipy.SpotifyException carries http_status and headers
+                if getattr(e, 'http_status', None) != 429 or attempt == self.max_retries:
+                    raise
+                # the 429 already paused every worker through response_hook
+                if not self._local.hook_paused:
+                    self.pause(self.retry_after(getattr(e, 'headers', None)))
+
+    def response_hook(self, response, *args, **kwargs):
+        """
+            requests response hook that pauses the scheduler on any 429.
+
+            spotipy retries 429s internally, this makes those retries visible
+            to every other worker too. A 429 that then reaches call is not
+            paused for a second time.
+        """
+
+        if response.status_code == 429:
+            self.pause(self.retry_after(response.headers))
+            self._local.hook_paused = True
+
+        return response
+
+    def install(self, session):
+        """
+            Register response_hook on a requests Session.
+        """
+
+        if session is not None and self.response_hook not in session.hooks['response']:
+            session.hooks['response'].append(self.response_hook)
+
+        return session
+
+    def metrics(self):
+        """
+            Return scheduler counters.
+        """
+
+        with self._cond:
+            return {'calls': self.calls,
+                    'rate_limited': self.rate_limited,
+                    'queue_depth': self.queue_depth,
+                    'max_queue_depth': self.max_queue_depth,
+                    'throttle_time': round(self.throttle_time, 3)}
+
+
+class ScheduledClient:
+    """
+        Proxy that routes every method call of client through a scheduler.
+    """
+
+    def __init__(self, client, scheduler):
+
+        self.client = client
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def scheduled(*args, **kwargs):
+            return self.scheduler.call(attr, *args, **kwargs)
+
+        return scheduled
+
+
+def schedule(client, scheduler=None):
+    """
+        Return client wrapped in a ScheduledClient, or as is without a scheduler.
+    """
+
+    if scheduler is None or client is None or isinstance(client, ScheduledClient):
+        return client
+
+    return ScheduledClient(client, scheduler)
@@ -0,0 +1,208 @@
+"""
+    Columnar Parquet snapshots of the catalog and concert tables.
+
+    After Catalog.load_records commits, every table is written once to a
+    Parquet file partitioned by scrape date:
+
+        <directory>/<table>/scrape_date=<YYYY-MM-DD>/part-0.parquet
+
+    Every table has a fixed Arrow schema derived from its SQLAlchemy column
+    types, so all partitions of a table share dtypes and read as one
+    dataset: integers as int32, repetitive strings dictionary encoded.
+    Analysts load snapshots memory-mapped instead of scanning the
+    production database.
+
+    pyarrow is only needed when snapshots are written or read.
+"""
+
+import os
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy.sql import sqltypes
+
+from app import db
+from app.models import Artist, Concert, Track, artist_concert
+from config import base_dir, logger
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(base_dir, 'snapshots')
+
+SNAPSHOT_TABLES = {
+    'artist': Artist.__table__,
+    'track': Track.__table__,
+    'concert': Concert.__table__,
+    'artist_concert': artist_concert,
+}
+
+PARTITION = 'scrape_date'
+
+# String columns with few distinct values, stored dictionary encoded
+DICTIONARY_COLUMNS = {
+    'concert': ('show_location', 'show_info'),
+}
+
+
+def import_pyarrow():
+    """
+        Return (pyarrow, pyarrow.parquet), raising a clear error if missing.
+    """
+
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Parquet snapshots require pyarrow: pip install pyarrow') from None
+
+    return pyarrow, pyarrow.parquet
+
+
+def arrow_type(table, column):
+    """
+        Return the Arrow type a table column is stored as.
+    """
+
+    pa, _ = import_pyarrow()
+    column_type = column.type
+
+    if isinstance(column_type, sqltypes.BigInteger):
+        return pa.int64()
+    if isinstance(column_type, sqltypes.Integer):
+        # SQL INTEGER is 32 bit, nulls are kept by Arrow's validity bitmap
+        return pa.int32()
+    if isinstance(column_type, sqltypes.Float):
+        return pa.float64()
+    if isinstance(column_type, sqltypes.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, sqltypes.DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, sqltypes.Date):
+        return pa.date32()
+    if column.name in DICTIONARY_COLUMNS.get(table, ()):
+        return pa.dictionary(pa.int32(), pa.string())
+
+    return pa.string()
+
+
+def table_schema(table):
+    """
+        Return the fixed Arrow schema of a key of SNAPSHOT_TABLES.
+    """
+
+    pa, _ = import_pyarrow()
+    return pa.schema([pa.field(column.name, arrow_type(table, column))
+                      for column in SNAPSHOT_TABLES[table].columns])
+
+
+def to_arrow(df, table):
+    """
+        Return df as an Arrow Table with the table's fixed schema.
+
+        Integer columns holding a NULL arrive as float64 and are converted
+        back to integers without passing through a narrower float.
+    """
+
+    pa, _ = import_pyarrow()
+    schema = table_schema(table)
+    arrays = [pa.array(df[field.name], type=field.type, from_pandas=True)
+              for field in schema]
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def partition_path(directory, table, scrape_date):
+
+    return os.path.join(directory, table, f'{PARTITION}={scrape_date:%Y-%m-%d}',
+                        'part-0.parquet')
+
+
+def export_snapshots(directory=DEFAULT_SNAPSHOT_DIR, scrape_date=None, tables=None):
+    """
+        Write one snapshot of each table for scrape_date, replacing an earlier
+        one of the same day.
+
+        Args:
+            directory: snapshot root folder
+            scrape_date: partition date, defaults to today
+            tables: keys of SNAPSHOT_TABLES, defaults to all
+
+        Returns:
+            dict of table -> snapshot path
+    """
+
+    _, pq = import_pyarrow()
+    scrape_date = scrape_date or date.today()
+
+    paths = {}
+    for name in tables or SNAPSHOT_TABLES:
+        table = SNAPSHOT_TABLES[name]
+        df = pd.read_sql(table.select(), db.session.bind)
+
+        path = partition_path(directory, name, scrape_date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write beside the partition and swap, readers never see a partial file,
+        # the leading dot keeps a leftover out of dataset reads
+        tmp_path = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.tmp')
+        pq.write_table(to_arrow(df, name), tmp_path)
+        os.replace(tmp_path, path)
+
+        logger.info('Snapshot %s: %s rows to %s', name, len(df), path)
+        paths[name] = path
+
+    return paths
+
+
+def snapshot_dates(table, directory=DEFAULT_SNAPSHOT_DIR):
+    """
+        Return sorted scrape dates with a snapshot of table.
+    """
+
+    table_dir = os.path.join(directory, table)
+    if not os.path.isdir(table_dir):
+        return []
+
+    prefix = f'{PARTITION}='
+    return sorted(datetime.strptime(each[len(prefix):], '%Y-%m-%d').date()
+                  for each in os.listdir(table_dir) if each.startswith(prefix))
+
+
+def load_snapshot(table, scrape_date=None, directory=DEFAULT_SNAPSHOT_DIR, columns=None):
+    """
+        Return DataFrame of a table snapshot, read through a memory map.
+
+        Args:
+            table: key of SNAPSHOT_TABLES
+            scrape_date: partition to read, defaults to the newest
+            columns: only read these columns
+    """
+
+    _, pq = import_pyarrow()
+
+    if scrape_date is None:
+        dates = snapshot_dates(table, directory)
+        if not dates:
+            raise FileNotFoundError(f'No {table} snapshots in {directory}')
+        scrape_date = dates[-1]
+
+    arrow_table = pq.read_table(partition_path(directory, table, scrape_date),
+                                columns=columns, memory_map=True)
+
+    return arrow_table.to_pandas()
+
+
+def load_history(table, directory=DEFAULT_SNAPSHOT_DIR, columns=None):
+    """
+        Return DataFrame of every snapshot of a table, read as one dataset.
+
+        Rows carry the scrape_date of their partition.
+    """
+
+    _, pq = import_pyarrow()
+
+    table_dir = os.path.join(directory, table)
+    if not snapshot_dates(table, directory):
+        raise FileNotFoundError(f'No {table} snapshots in {directory}')
+
+    if columns is not None:
+        columns = list(columns) + [PARTITION]
+
+    return pq.read_table(table_dir, columns=columns, memory_map=True).to_pandas()
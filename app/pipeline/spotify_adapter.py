@@ -26,19 +26,46 @@ import json
 import os
 import pdb
 import time
+from itertools import chain
 from pathlib import WindowsPath
 
-import jmespath
+import numpy as np
 import pandas as pd
 import spotipy
+from spotipy.client import SpotifyException
 from spotipy.oauth2 import SpotifyOAuth
 
 from app import db, logger
 from app.models import Artist, Track
+from app.pipeline.matching import NameIndex, normalize_name
+from app.pipeline.projections import (has_artists, project_artist_ids, project_artist_stats,
+                                      project_artists, project_several_artists, project_tracks)
+from app.pipeline.response_cache import ResponseCache
+from app.pipeline.scheduler import RequestScheduler, schedule
+from app.pipeline.workers import DEFAULT_MAX_WORKERS, bounded_map
 from config import base_dir, load_dotenv
 
 load_dotenv(dotenv_path=base_dir)
 
+# Max ids accepted by the several-artists endpoint
+SEVERAL_ARTISTS_LIMIT = 50
+
+# Max tracks per playlist add/remove request
+PLAYLIST_BATCH_SIZE = 100
+# Max items per playlist tracks page, and the fields read from each
+PLAYLIST_PAGE_SIZE = 100
+PLAYLIST_TRACK_FIELDS = 'total,items(track(id,uri))'
+# Max playlists per current_user_playlists page
+USER_PLAYLISTS_PAGE_SIZE = 50
+# Persisted playlist name -> id cache
+PLAYLIST_CACHE_PATH = os.path.join(base_dir, 'playlist_ids.json')
+
+# Archive endpoint of the artist names get_artist_info searched
+SEARCHED_ARTISTS = 'searched_artists'
+
+# tie_break policies of SpotifyArtistManager.drop_dup_artists
+DUP_TIE_BREAKS = ('first', 'popularity')
+
 # TODO: create spotify singleton/ Module Variable
 # issue with circular imports/where spotify object created
 
@@ -47,13 +74,29 @@ class SpotipyAdapter():
         Adapter to spotipy library.
     """
 
-    def __init__(self, session=None):
+    def __init__(self, session=None, max_workers=DEFAULT_MAX_WORKERS, max_in_flight=None,
+                 cache=None, negative_cache=None, scheduler=None,
+                 playlist_cache_path=PLAYLIST_CACHE_PATH, projection_only=False, archive=None):
         
         self.session = session
         self.spotify = None
         self.artist_data = None
         self.track_data = None
 
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        # ResponseCache/NegativeCache shared by every manager this adapter creates
+        self.cache = cache
+        self.negative_cache = negative_cache
+        # every spotipy call from the managers shares one rate limit
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self.scheduler.install(self.session)
+        self.playlist_cache_path = playlist_cache_path
+        # keep only projected fields of catalog responses, see SpotifyArtistManager
+        self.projection_only = projection_only
+        # ResponseArchive every catalog response is appended to
+        self.archive = archive
+
     def authenticate_user(self):
 
         auth_mgr = SpotifyAuthManager(session=self.session)
@@ -62,20 +105,43 @@ class SpotipyAdapter():
 
         return self
 
-    def update_playlist(self):
+    def update_playlist(self, track_ids=None, playlist_name='test', create=False):
+        """
+            Sync playlist_name to hold exactly track_ids.
+        """
+
+        playlist_mgr = self.get_playlist_mgr(playlist_name=playlist_name, create=create)
+        playlist_mgr.get_playlist_id()
+        playlist_mgr.update_playlist(track_ids or [])
+
         return self
 
+    def get_playlist_mgr(self, playlist_name='test', create=False):
+        """
+            Return SpotifyPlaylistManager sharing this adapter's scheduler.
+        """
+
+        return SpotifyPlaylistManager(playlist_name=playlist_name, spotify=self.spotify,
+                                      scheduler=self.scheduler, max_workers=self.max_workers,
+                                      cache_path=self.playlist_cache_path, create=create)
+
     def get_catalog_data(self, artists=None):
         """
             Create Artist ad Track DataFrames.
         """
 
     
-        artist_mgr = SpotifyArtistManager(spotify=self.spotify, artists=artists)
+        artist_mgr = SpotifyArtistManager(spotify=self.spotify, artists=artists,
+                                          max_workers=self.max_workers,
+                                          max_in_flight=self.max_in_flight,
+                                          cache=self.cache,
+                                          negative_cache=self.negative_cache,
+                                          scheduler=self.scheduler,
+                                          projection_only=self.projection_only,
+                                          archive=self.archive)
 
         artist_mgr.get_artist_info()
         artist_mgr.get_track_info()
-        artist_mgr.save_artist_json()
         artist_mgr.prepare_data()
 
         self.artist_data = artist_mgr.artist_info
@@ -83,9 +149,49 @@ class SpotipyAdapter():
 
         return self
 
+    def refresh_catalog_data(self, spotify_ids=None, chunk_size=SEVERAL_ARTISTS_LIMIT):
+        """
+            Refresh popularity and followers of artists already in the catalog.
+
+            Known spotify ids are looked up through the several-artists endpoint,
+            chunk_size ids per request, instead of one search per artist name.
+
+            Args:
+                spotify_ids: ids to refresh, defaults to every Artist in the catalog
+                chunk_size: ids per request, Spotify allows at most 50
+
+            Returns:
+                number of Artist rows updated
+        """
+
+        if spotify_ids is None:
+            spotify_ids = [each for each, in db.session.query(Artist.spotify_id)
+                           if each is not None]
+
+        artist_mgr = SpotifyArtistManager(spotify=self.spotify,
+                                          max_workers=self.max_workers,
+                                          max_in_flight=self.max_in_flight,
+                                          cache=self.cache,
+                                          scheduler=self.scheduler)
+        stats = artist_mgr.get_artist_stats(spotify_ids, chunk_size=chunk_size)
+
+        return update_artist_stats(stats)
+
 # TODO:
 # need to add try except to refresh tokens
 # make class singleton
+class EnvSetting:
+    """
+        Class attribute read from the environment on access, not at import.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return os.environ[self.name]
+
+
 class SpotifyAuthManager():
     """
         A class used to handle Spotify Oauth.
@@ -101,11 +207,12 @@ class SpotifyAuthManager():
 
     """
 
-    username = os.environ['SPOTIFY_USERNAME']
-    client_id = os.environ['SPOTIFY_CLIENT_ID']
-    client_secret = os.environ['SPOTIFY_CLIENT_SECRET']
-    scope = os.environ['SPOTIFY_SCOPE']
-    redirect_uri = os.environ['SPOTIFY_REDIRECT_URI']
+    # read when first used, so importing the module needs no credentials
+    username = EnvSetting('SPOTIFY_USERNAME')
+    client_id = EnvSetting('SPOTIFY_CLIENT_ID')
+    client_secret = EnvSetting('SPOTIFY_CLIENT_SECRET')
+    scope = EnvSetting('SPOTIFY_SCOPE')
+    redirect_uri = EnvSetting('SPOTIFY_REDIRECT_URI')
 
     def __init__(self, session=None):
 
@@ -193,21 +300,108 @@ class SpotifyPlaylistManager():
         Followers
     """
 
-    def __init__(self, playlist_name='test', spotify=None):
+    def __init__(self, playlist_name='test', spotify=None, scheduler=None, username=None,
+                 max_workers=DEFAULT_MAX_WORKERS, cache_path=None, create=False):
 
         self.playlist_id = None
-        self.spotify = spotify
+        self.spotify = schedule(spotify, scheduler)
         self.playlist_name = playlist_name
+        # falls back to SPOTIFY_USERNAME when first needed, see username
+        self._username = username
+        self.max_workers = max_workers
+        # JSON file of playlist name -> id, ids are trusted until a call 404s
+        self.cache_path = cache_path
+        # create the playlist when no playlist has playlist_name
+        self.create = create
 
         self.spotify_dict = None
+        # playlist version the last read or write was based on
+        self.snapshot_id = None
+
+    @property
+    def username(self):
+        """
+            Playlist owner, SpotifyAuthManager.username unless one was given.
+        """
+
+        return self._username or SpotifyAuthManager.username
+
+    def load_playlist_ids(self):
+        """
+        Return persisted playlist name -> id cache.
+        """
 
-    def get_playlist_id(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return {}
+
+        with open(self.cache_path, 'r') as f:
+            return json.load(f)
+
+    def save_playlist_id(self):
+        """
+        Persist playlist_id under playlist_name.
+        """
+
+        if self.cache_path is None:
+            return
+
+        playlist_ids = self.load_playlist_ids()
+        playlist_ids[self.playlist_name] = self.playlist_id
+        with open(self.cache_path, 'w') as f:
+            json.dump(playlist_ids, f)
+
+    def get_playlist_id(self, refresh=False):
         """
         Return uri of specified user playlists.
+
+        Uses the persisted id unless refresh is set, otherwise looks the
+        name up and creates the playlist if create is set.
+        """
+
+        if not refresh:
+            self.playlist_id = self.load_playlist_ids().get(self.playlist_name)
+            if self.playlist_id is not None:
+                return self.playlist_id
+
+        self.playlist_id = self.find_playlist_id()
+        if self.playlist_id is None:
+            if not self.create:
+                raise KeyError(f'No playlist named {self.playlist_name}')
+            self.playlist_id = self.create_playlist()
+
+        self.save_playlist_id()
+
+        return self.playlist_id
+
+    def find_playlist_id(self):
+        """
+        Page through the user's playlists until one is named playlist_name.
+
+        Returns:
+            playlist id, or None if no playlist matches
+        """
+
+        offset = 0
+        while True:
+            page = self.spotify.current_user_playlists(limit=USER_PLAYLISTS_PAGE_SIZE,
+                                                       offset=offset)
+            for playlist in page['items']:
+                if playlist['name'] == self.playlist_name:
+                    return playlist['id']
+            if not page.get('next'):
+                return None
+            offset += USER_PLAYLISTS_PAGE_SIZE
+
+    def create_playlist(self):
+        """
+        Create a private playlist named playlist_name and return its id.
         """
 
-        self.playlist_id = jmespath.search(f"items[?name=='{self.playlist_name}'].id",
-                                           self.spotify.current_user_playlists())[0]
+        playlist = self.spotify.user_playlist_create(self.username, self.playlist_name,
+                                                     public=False)
+        logger.info('Created playlist %s', self.playlist_name)
+
+        return playlist['id']
 
     def get_playlist_artists(self):
         """
@@ -215,36 +409,133 @@ class SpotifyPlaylistManager():
         """
         pass
 
+    def get_snapshot_id(self):
+        """
+        Set snapshot_id attribute to the playlist's current version.
+
+        This is the first call of a sync, so it also validates a cached
+        playlist_id.
+        """
+
+        try:
+            playlist = self.spotify.user_playlist(self.username, self.playlist_id,
+                                                  fields='snapshot_id')
+        except SpotifyException as e:
+            # cached id of a deleted playlist, resolve the name again
+            if e.http_status != 404:
+                raise
+            self.get_playlist_id(refresh=True)
+            playlist = self.spotify.user_playlist(self.username, self.playlist_id,
+                                                  fields='snapshot_id')
+        self.snapshot_id = playlist['snapshot_id']
+
+        return self.snapshot_id
+
+    def get_tracks_page(self, offset):
+        """
+        Return one page of playlist items starting at offset.
+        """
+
+        return self.spotify.user_playlist_tracks(self.username, self.playlist_id,
+                                                 fields=PLAYLIST_TRACK_FIELDS,
+                                                 limit=PLAYLIST_PAGE_SIZE, offset=offset)
+
+    def iter_playlist_tracks(self):
+        """
+        Yield playlist tracks as {'id', 'uri'} dicts, in playlist order.
+
+        The first page gives the total, the remaining pages are fetched
+        max_workers at a time and yielded as they complete in order, so
+        large playlists are never held in memory whole.
+        """
+
+        first = self.get_tracks_page(0)
+        offsets = range(PLAYLIST_PAGE_SIZE, first['total'], PLAYLIST_PAGE_SIZE)
+        pages = chain([first], bounded_map(self.get_tracks_page, offsets,
+                                           max_workers=self.max_workers))
+        for page in pages:
+            for item in page['items']:
+                # local files and removed tracks have no track object
+                if item.get('track'):
+                    yield item['track']
+
     def get_playlist_tracks(self):
         """
+        Return track ids in the playlist, in playlist order.
         """
-        # Get full details of the tracks of a playlist owned by a user
-        self.spotify.user_playlist_tracks()
+
+        return [track['id'] for track in self.iter_playlist_tracks()]
 
     def add_tracks(self, uris):
         """
         Add tracks to playlist matchig ply_id attribute.
 
+        Sends PLAYLIST_BATCH_SIZE tracks per request.
+
         Args: uris
         """
-        pass
 
-        # self.spotify.user_playlist_add_tracks(self.username, self.ply_id, uris)
+        for chunk in batches(uris, PLAYLIST_BATCH_SIZE):
+            result = self.spotify.user_playlist_add_tracks(self.username, self.playlist_id, chunk)
+            self.snapshot_id = result['snapshot_id']
+
+        return self.snapshot_id
+
+    def remove_tracks(self, uris):
+        """
+        Remove all occurrences of tracks, PLAYLIST_BATCH_SIZE per request.
+
+        The first request is based on snapshot_id, so tracks added by
+        someone else since the playlist was read are not removed.
+        """
 
-    def clear_playlist(self, spotify, user, playlist_id=None):
+        for chunk in batches(uris, PLAYLIST_BATCH_SIZE):
+            result = self.spotify.user_playlist_remove_all_occurrences_of_tracks(
+                self.username, self.playlist_id, chunk, snapshot_id=self.snapshot_id)
+            self.snapshot_id = result['snapshot_id']
+
+        return self.snapshot_id
+
+    def sync_playlist(self, track_ids):
+        """
+        Make the playlist hold track_ids, touching only the difference.
+
+        Returns:
+            dict with added and removed track ids and the final snapshot_id
+        """
+
+        self.get_snapshot_id()
+        current = self.get_playlist_tracks()
+
+        desired = list(dict.fromkeys(track_ids))
+        desired_set = set(desired)
+        current_set = set(current)
+
+        removed = [each for each in dict.fromkeys(current)
+                   if each is not None and each not in desired_set]
+        added = [each for each in desired if each not in current_set]
+
+        self.remove_tracks(removed)
+        self.add_tracks(added)
+        logger.info('Synced playlist %s: %s added, %s removed',
+                    self.playlist_name, len(added), len(removed))
+
+        return {'added': added, 'removed': removed, 'snapshot_id': self.snapshot_id}
+
+    def clear_playlist(self):
         """ Remove all tracks from playlist. """
 
-        playlist_tracks = spotify.user_playlist_tracks(user, playlist_id)
-        spotify.user_playlist_remove_all_occurrences_of_tracks(
-            user, playlist_id, playlist_tracks, snapshot_id=None)
+        self.get_snapshot_id()
+        uris = list(dict.fromkeys(track['uri'] for track in self.iter_playlist_tracks()))
+
+        return self.remove_tracks(uris)
 
-    def update_playlist(self):
+    def update_playlist(self, track_ids):
         """
         Update spotify playlist. Once per week.
         """
-        pass
-        # self.clear_playlist()
-        # self.add_tracks()
+
+        return self.sync_playlist(track_ids)
 
 
 class SpotifyArtistManager():
@@ -253,73 +544,197 @@ class SpotifyArtistManager():
 
     """
 
-    def __init__(self, spotify=None, artists=None):
+    def __init__(self, spotify=None, artists=None, max_workers=DEFAULT_MAX_WORKERS,
+                 max_in_flight=None, cache=None, negative_cache=None, scheduler=None,
+                 match_threshold=0.8, projection_only=False, archive=None):
 
-        self.spotify = spotify
+        self.spotify = schedule(spotify, scheduler)
         self.artists = artists
+        # lowest similarity accepted by check_artist_names
+        self.match_threshold = match_threshold
+        self._name_index = None
+        self._name_index_artists = None
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.archive = archive
+
+        # max_workers=1 keeps the original one-at-a-time behavior
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
 
         self.artist_response = None
         self.track_response = None
 
+        # project each response on arrival, artist_response/track_response stay None
+        self.projection_only = projection_only
+        self.artist_info = None
+        self.track_info = None
+
     def find_artist_info(self, query=None, item_type=None):
         """
             Query Spotify Search endpoint.
         """
 
         kwargs = {'q': f'{item_type}: {query}', 'type': item_type}
-        result = self.spotify.search(**kwargs)
+        result = self.call('search', self.spotify.search, **kwargs)
         result = result if result is not None else None
 
         return result
 
+    def call(self, endpoint, func, *args, **kwargs):
+        """
+            Call spotipy method, served from the response cache when one is set.
+
+            Responses are appended to the archive when one is set.
+        """
+
+        if self.cache is None:
+            response = func(*args, **kwargs)
+        else:
+            response = self.cache.cached(endpoint, func, *args, **kwargs)
+
+        if self.archive is not None:
+            self.archive.append(endpoint, ResponseCache.make_key(*args, **kwargs), response)
+
+        return response
+
+    def get_top_tracks(self, artist_id):
+        """
+            Query Spotify Artist Top Tracks endpoint.
+        """
+
+        return self.call('artist_top_tracks', self.spotify.artist_top_tracks, artist_id)
+
+    def find_several_artists(self, spotify_ids):
+        """
+            Query Spotify Several Artists endpoint.
+        """
+
+        return self.call('artists', self.spotify.artists, spotify_ids)
+
+    def search_artist(self, artist):
+        """
+            Query Spotify Search endpoint for a single artist name.
+        """
+
+        return self.find_artist_info(query=artist, item_type='artist')
+
     def get_artist_info(self):
         """
             Set spotify_artists attribute to list of filtered artist json objects returned from
             Spotify API query. List of dicts that are used to load into catalog dataframe.
 
+            Searches run concurrently on max_workers threads. Responses keep the
+            order of the artists attribute. Names in the negative cache are not
+            searched until their back-off expires. With projection_only the
+            artist_info attribute is filled instead.
         """
 
-        artists = self.artists
+        # spelling variants of the same name share one search
+        artists = []
+        seen = set()
+        for each in self.artists:
+            key = normalize_name(each)
+            if key not in seen:
+                seen.add(key)
+                artists.append(each)
         results = []
 
-        for each in artists:
+        if self.negative_cache is not None:
+            artists = [each for each in artists
+                       if not self.negative_cache.is_known_miss(each)]
+
+        if self.archive is not None:
+            # names actually searched, so a replay repeats exactly these calls
+            self.archive.append(SEARCHED_ARTISTS, None, artists)
+
+        responses = bounded_map(self.search_artist, artists,
+                                max_workers=self.max_workers,
+                                max_in_flight=self.max_in_flight)
+
+        for each, result in zip(artists, responses):
             # logger.info(
             #     'Queried Spotify API Artist Endpoint for: %s\n\n', each)
-            result = self.find_artist_info(query=each, item_type='artist')
-            if jmespath.search("artists.items", result):
+            if has_artists(result):
                 # TODO: fix this log to only return artist names
                 # logger.info('Spotify API Artist Endpoint returned:\n\n %s',
                 #             jmespath.search("artists.items", result))
-                results.append(result)
+                if self.projection_only:
+                    results.extend(project_artists(result))
+                else:
+                    results.append(result)
+                if self.negative_cache is not None:
+                    self.negative_cache.record_hit(each)
 
             else:
+                if self.negative_cache is not None:
+                    self.negative_cache.record_miss(each)
                 continue
 
-        self.artist_response = results
+        if self.projection_only:
+            self.artist_info = results
+        else:
+            self.artist_response = results
+
+    def get_several_artists(self, spotify_ids, chunk_size=SEVERAL_ARTISTS_LIMIT):
+        """
+            Return full artist objects for known spotify ids.
+
+            Ids are sent to the several-artists endpoint in chunks of chunk_size.
+            Ids Spotify no longer knows come back as null and are dropped.
+        """
+
+        chunk_size = min(chunk_size, SEVERAL_ARTISTS_LIMIT)
+        chunks = [spotify_ids[i:i + chunk_size]
+                  for i in range(0, len(spotify_ids), chunk_size)]
+        responses = bounded_map(self.find_several_artists, chunks,
+                                max_workers=self.max_workers,
+                                max_in_flight=self.max_in_flight)
+
+        return [artist for response in responses
+                for artist in project_several_artists(response)]
+
+    def get_artist_stats(self, spotify_ids, chunk_size=SEVERAL_ARTISTS_LIMIT):
+        """
+            Return popularity and follower counts for known spotify ids.
+        """
+
+        artists = self.get_several_artists(list(spotify_ids), chunk_size=chunk_size)
+        return project_artist_stats(artists)
 
     def get_track_info(self):
         """
             Return uris of all the artists top ten tracks.
+
+            Requests share the spotify client's session and run on max_workers
+            threads. Results stay aligned index-for-index with the artist ids.
+            With projection_only each response is projected in its worker and
+            the track_info attribute is filled instead.
         """
 
         # get all artist ids
-        artist_ids = jmespath.search(
-            "[].artists.items[].id", self.artist_response)
-        results = [self.spotify.artist_top_tracks(each) for each in artist_ids]
+        if self.projection_only:
+            artist_ids = [artist['spotify_id'] for artist in self.artist_info]
+            results = list(bounded_map(self.get_projected_tracks, artist_ids,
+                                       max_workers=self.max_workers,
+                                       max_in_flight=self.max_in_flight))
+            self.track_info = results
+            return
+
+        artist_ids = [each for response in self.artist_response
+                      for each in project_artist_ids(response)]
+        results = list(bounded_map(self.get_top_tracks, artist_ids,
+                                   max_workers=self.max_workers,
+                                   max_in_flight=self.max_in_flight))
 
         self.track_response = results
 
-    def save_artist_json(self):
+    def get_projected_tracks(self, artist_id):
         """
-            Save artist json objects to file for logging/testing.
+            Return track dicts of an artist's top tracks, raw response discarded.
         """
 
-        fixture_path = WindowsPath(base_dir / r'test/fixtures')
-        with open(fixture_path / 'spotify_artists.json', 'w') as f:
-            json.dump(self.artist_response, f)
-
-        with open(fixture_path / 'spotify_track_ids.json', 'w') as f:
-            json.dump(self.track_response, f)
+        return project_tracks(self.get_top_tracks(artist_id))
 
     def format_artist_info(self):
         """
@@ -327,9 +742,8 @@ class SpotifyArtistManager():
         """
 
        # Artist ID
-        data = jmespath.search(
-            "[].artists.items[].{artist_name: name, genres: genres, spotify_id: id,"
-            "popularity: popularity, followers: followers.total}", self.artist_response)
+        data = [artist for response in self.artist_response
+                for artist in project_artists(response)]
 
         return data
 
@@ -339,55 +753,131 @@ class SpotifyArtistManager():
         """
 
         # TrackID
-        data = jmespath.search(
-            "[].tracks[*].{track_id: id, track_name: name}", self.track_response)
+        data = [project_tracks(response) for response in self.track_response]
 
         return data
 
     def prepare_data(self):
         """
             Creates list of dicts to load into DataFrame.
-            Add artist ID to track dicts for Foreign Key.
+            Track dicts stay grouped per artist, index-aligned with artist_info,
+            so Catalog.load_records can set the Foreign Key.
         """
 
-        self.artist_info = self.format_artist_info()
+        # projection_only runs filled artist_info/track_info on arrival
+        if not self.projection_only:
+            self.artist_info = self.format_artist_info()
+            self.track_info = self.format_track_info()
 
-        track_info = self.format_track_info()
-        if len(self.artist_info) != len(track_info):
+        if len(self.artist_info) != len(self.track_info):
             raise AssertionError('Spotify Query Error')
-        else:
-            # add artist id to dict to create foreign key
-            for i, each in enumerate(track_info):
-                for track in each:
-                    track['artist_id'] = self.artist_info[i]['artist_id']
-
-        self.track_info = [j for i in track_info for j in i]
 
     def check_artist_names(self, df):
         """
             Check if Artist name returned from Spotify Query matches up with name scraped from
             web.
+
+            Names are matched through a normalized/trigram NameIndex of the
+            scraped names, built once per artist list. Rows below
+            match_threshold are dropped, the rest get the scraped name and a
+            match_confidence column.
         """
 
-        artists = self.artists
+        index = self.name_index
+        matches = [index.match(name) for name in df['artist_name']]
+
+        df = df.assign(artist_name=[name for name, _ in matches],
+                       match_confidence=[confidence for _, confidence in matches])
         # compare artist columns between two df's. drop all that don't match
-        df = df.loc[df['artist_name'].str.lower().isin(artists), :]
-        df.loc[:, 'artist_name'] = df.loc[:, 'artist_name'].str.lower()
+        return df.loc[df['artist_name'].notnull(), :]
 
-        return df
+    @property
+    def name_index(self):
+        """
+            NameIndex of the scraped artist names.
+        """
+
+        if self._name_index is None or self._name_index_artists is not self.artists:
+            self._name_index = NameIndex(self.artists or [], threshold=self.match_threshold)
+            self._name_index_artists = self.artists
+
+        return self._name_index
 
     @staticmethod
-    def drop_dup_artists(df):
+    def drop_dup_artists(df, tie_break='first'):
         """
             Keep Duplicate artist name returned from Spotify query that has most followers.
+
+            Picks the max-followers row per artist_name with a hashed group max
+            instead of sorting the frame, and never modifies df. Rows keep
+            their input order.
+
+            Args:
+                df: DataFrame with artist_name and followers columns
+                tie_break: how equal follower counts are resolved
+                    'first': earliest row, i.e. Spotify's search ranking
+                    'popularity': highest popularity, then earliest row
         """
 
-        # sort by followers
-        df.sort_values(by=['followers'], ascending=False, inplace=True)
-        # Keep duplicate artist with most followers
-        df.drop_duplicates(subset='artist_name', inplace=True)
-        return df
+        if tie_break not in DUP_TIE_BREAKS:
+            raise ValueError(f'tie_break must be one of {DUP_TIE_BREAKS}')
+
+        if df.empty:
+            return df
+
+        key = df['followers'].fillna(-1).values.astype('int64')
+        if tie_break == 'popularity':
+            # popularity is 0-100, fold it into the key below followers
+            key = key * 101 + df['popularity'].fillna(0).values.astype('int64')
+
+        codes, _ = pd.factorize(df['artist_name'])
+        group_max = pd.Series(key).groupby(codes, sort=False).transform('max').values
+        # rows holding their group's max, the first of them wins
+        candidates = np.flatnonzero(key == group_max)
+        first = ~pd.Series(codes[candidates]).duplicated().values
+
+        return df.iloc[candidates[first]]
+
+
+def update_artist_stats(stats, chunk_size=500):
+    """
+        Bulk update popularity and followers of existing Artist rows.
+
+        Args:
+            stats: list of dicts with spotify_id, popularity and followers
+
+        Returns:
+            number of Artist rows updated
+    """
+
+    stats = {each['spotify_id']: each for each in stats}
+    spotify_ids = list(stats)
+    mappings = []
+
+    for i in range(0, len(spotify_ids), chunk_size):
+        chunk = spotify_ids[i:i + chunk_size]
+        rows = (db.session.query(Artist.id, Artist.spotify_id)
+                .filter(Artist.spotify_id.in_(chunk)))
+        mappings.extend({'id': artist_id,
+                         'popularity': stats[spotify_id]['popularity'],
+                         'followers': stats[spotify_id]['followers']}
+                        for artist_id, spotify_id in rows)
+
+    db.session.bulk_update_mappings(Artist, mappings)
+    db.session.commit()
+    logger.info('Refreshed stats for %s artists', len(mappings))
+
+    return len(mappings)
+
+
+def batches(items, size):
+    """
+        Yield consecutive lists of at most size items.
+    """
 
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
 def load_data(data):
@@ -0,0 +1,53 @@
+"""
+    Helpers for running pipeline I/O concurrently.
+
+    Spotify and web requests are latency bound, so the pipeline fans them out
+    over a small thread pool. Results always come back in input order so
+    callers that zip results by position keep working.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def bounded_map(func, iterable, max_workers=DEFAULT_MAX_WORKERS, max_in_flight=None):
+    """
+        Yield func(item) for each item in iterable, in input order.
+
+        At most max_in_flight calls are submitted to the pool at any time, so a
+        long input never queues thousands of requests at once.
+
+        Args:
+            func: callable taking one item
+            iterable: items to process
+            max_workers: thread pool size
+            max_in_flight: max submitted but unconsumed calls,
+                defaults to 2 * max_workers. A smaller value also caps the
+                pool size, so it limits concurrent calls too
+    """
+
+    max_workers = max(1, int(max_workers or 1))
+    max_in_flight = max(1, int(max_in_flight or 2 * max_workers))
+    max_workers = min(max_workers, max_in_flight)
+
+    if max_workers == 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        try:
+            for item in iterable:
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(func, item))
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # don't leave queued calls running if the consumer stops early
+            for future in pending:
+                future.cancel()
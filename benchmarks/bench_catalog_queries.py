@@ -0,0 +1,107 @@
+"""
+    Benchmark catalog lookup queries with and without the lookup indexes.
+
+    Seeds a SQLite database shaped like the artist_tbl/track_tbl fixtures,
+    scaled to 100k rows, and times the queries playlist building and the web
+    view run: artist by name, tracks per artist and concert -> artist joins.
+
+    Usage:
+        python -m benchmarks.bench_catalog_queries [--rows 100000] [--lookups 1000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+
+from app import db
+from app.models import Artist, Concert, Track, artist_concert
+
+LOOKUP_INDEXES = ('ix_artist_artist_name', 'ix_track_artist_id',
+                  'ix_artist_concert_concert_id')
+
+
+def seed(engine, rows):
+    """
+        Insert rows artists, rows tracks, rows / 10 concerts and their links.
+    """
+
+    today = datetime.today()
+    concerts = rows // 10
+
+    with engine.begin() as conn:
+        conn.execute(Artist.__table__.insert(), [
+            dict(spotify_id=f'id_{i}', artist_name=f'artist_name_ar{i}', followers=i)
+            for i in range(rows)])
+        conn.execute(Track.__table__.insert(), [
+            dict(track_id=f'spotify_id_{i}', track_name=f'track_name_{i}',
+                 artist_id=i % rows + 1)
+            for i in range(rows)])
+        conn.execute(Concert.__table__.insert(), [
+            dict(artist_name=f'name_{i}', show_date=today + timedelta(days=i % 365),
+                 show_location=f'venue_{i}', show_info=f'info_{i}')
+            for i in range(concerts)])
+        conn.execute(artist_concert.insert(), [
+            dict(concert_id=i % concerts + 1, artist_id=i + 1) for i in range(rows)])
+
+
+def run_queries(engine, rows, lookups):
+    """
+        Return seconds spent on each lookup query.
+    """
+
+    ids = random.Random(0).sample(range(1, rows + 1), lookups)
+    concerts = rows // 10
+    queries = {
+        'artist_by_name': lambda conn, i: conn.execute(
+            select([Artist.id]).where(Artist.artist_name == f'artist_name_ar{i - 1}')).fetchall(),
+        'tracks_by_artist': lambda conn, i: conn.execute(
+            select([Track.track_id]).where(Track.artist_id == i)).fetchall(),
+        'concert_artists': lambda conn, i: conn.execute(
+            select([Artist.artist_name])
+            .select_from(artist_concert.join(Artist))
+            .where(artist_concert.c.concert_id == i % concerts + 1)).fetchall(),
+    }
+
+    timings = {}
+    with engine.connect() as conn:
+        for name, query in queries.items():
+            start = time.perf_counter()
+            for i in ids:
+                query(conn, i)
+            timings[name] = time.perf_counter() - start
+
+    return timings
+
+
+def main(rows=100000, lookups=1000):
+
+    path = os.path.join(tempfile.mkdtemp(), 'catalog_bench.sqlite')
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    seed(engine, rows)
+
+    indexed = run_queries(engine, rows, lookups)
+
+    with engine.begin() as conn:
+        for index in LOOKUP_INDEXES:
+            conn.execute(f'DROP INDEX {index}')
+    unindexed = run_queries(engine, rows, lookups)
+
+    print(f'{rows} rows, {lookups} lookups per query')
+    print(f'{"query":<20}{"no index (s)":>14}{"indexed (s)":>14}{"speedup":>10}')
+    for name in indexed:
+        speedup = unindexed[name] / indexed[name] if indexed[name] else float('inf')
+        print(f'{name:<20}{unindexed[name]:>14.4f}{indexed[name]:>14.4f}{speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+    main(rows=args.rows, lookups=args.lookups)
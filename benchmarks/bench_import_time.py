@@ -0,0 +1,78 @@
+"""
+    Benchmark import time of the pipeline modules.
+
+    Imports each module in a fresh interpreter, with the Spotify credentials
+    removed from the environment so an import that still authenticates or
+    prompts fails instead of hanging, and reports the best wall time.
+
+    Usage:
+        python -m benchmarks.bench_import_time [--runs 5] [--importtime]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+from config import base_dir
+
+MODULES = ('app.pipeline.spotify_adapter', 'app.pipeline.data_collection',
+           'app.pipeline.replay')
+
+TIMER = ('import time; start = time.perf_counter(); import {module}; '
+         'print(time.perf_counter() - start)')
+
+
+def import_seconds(module, importtime=False):
+    """
+        Return seconds a fresh interpreter spends importing module.
+    """
+
+    env = {key: value for key, value in os.environ.items() if not key.startswith('SPOTIFY_')}
+    # no terminal to answer an authentication prompt
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + [
+        '-c', TIMER.format(module=module)]
+    result = subprocess.run(command, cwd=base_dir, env=env, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, timeout=60)
+    if result.returncode:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr}')
+
+    if importtime:
+        print_slowest(result.stderr)
+
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def print_slowest(report, count=10):
+    """
+        Print the modules with the highest cumulative -X importtime.
+    """
+
+    rows = []
+    for line in report.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            rows.append((int(cumulative), name.strip()))
+
+    for cumulative, name in sorted(rows, reverse=True)[:count]:
+        print(f'    {cumulative / 1000:>10.1f} ms  {name}')
+
+
+def main(runs=5, importtime=False):
+
+    print(f'best of {runs} fresh interpreters')
+    for module in MODULES:
+        best = min(import_seconds(module) for _ in range(runs))
+        print(f'{module:<36}{best * 1000:>10.1f} ms')
+        if importtime:
+            import_seconds(module, importtime=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', action='store_true',
+                        help='also list the slowest imports of each module')
+    args = parser.parse_args()
+    main(runs=args.runs, importtime=args.importtime)
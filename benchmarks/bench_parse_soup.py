@@ -0,0 +1,92 @@
+"""
+    Benchmark the Scraper parser engines on a recorded page.
+
+    Loads an HTML file (by default the recorded live-music listing) or the
+    first response body recorded in a Betamax cassette, and times
+    PARSERS['soup'] against PARSERS['lxml']. Both engines must find shows
+    and produce the same concert_dict.
+
+    Usage:
+        python -m benchmarks.bench_parse_soup [--page PATH | --cassette PATH] [--runs 20]
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import time
+
+from app.pipeline.data_collection import PARSERS
+from config import base_dir
+
+PAGE_PATH = os.path.join(base_dir, 'tests', 'fixtures', 'pages', 'live-music.html')
+
+
+def load_cassette_page(path, uri=None):
+    """
+        Return decoded body of the first recorded response, or the one for uri.
+    """
+
+    with open(path, 'r') as f:
+        cassette = json.load(f)
+
+    for interaction in cassette['http_interactions']:
+        if uri is None or interaction['request']['uri'] == uri:
+            body = interaction['response']['body']
+            if 'base64_string' in body:
+                content = base64.b64decode(body['base64_string'])
+                encoding = interaction['response']['headers'].get('Content-Encoding', [])
+                return gzip.decompress(content) if 'gzip' in encoding else content
+            return body['string'].encode(body.get('encoding') or 'utf-8')
+
+    raise KeyError(f'No recorded response for {uri} in {path}')
+
+
+def time_engine(parser, content, runs):
+    """
+        Return (best seconds per run, concert_dict) for a parser engine.
+    """
+
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        concerts = parser.parse(parser.event_list(content))
+        best = min(best, time.perf_counter() - start)
+
+    return best, concerts
+
+
+def main(content, runs=20):
+
+    results = {name: time_engine(parser, content, runs) for name, parser in PARSERS.items()}
+    baseline = results['soup'][0]
+
+    print(f'{len(content)} bytes, best of {runs} runs')
+    for name, (seconds, concerts) in results.items():
+        print(f'{name:<6}{seconds * 1000:>10.2f} ms{baseline / seconds:>8.1f}x'
+              f'{len(concerts["concerts"]):>8} shows')
+
+    # a page without an event list only times whole-document parsing
+    empty = [name for name, (_, concerts) in results.items() if not concerts['concerts']]
+    if empty:
+        raise AssertionError(f'No shows parsed by {", ".join(empty)}')
+    if results['lxml'][1] != results['soup'][1]:
+        raise AssertionError('Parser engines disagree')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page', default=PAGE_PATH)
+    parser.add_argument('--cassette', default=None, help='Betamax cassette instead of a page')
+    parser.add_argument('--uri', default=None)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.cassette:
+        content = load_cassette_page(args.cassette, args.uri)
+    else:
+        with open(args.page, 'rb') as f:
+            content = f.read()
+
+    main(content, runs=args.runs)
@@ -0,0 +1,115 @@
+"""
+    Benchmark catalog response projections.
+
+    Times jmespath.search with string expressions against the precompiled
+    projections, then compares peak memory of a catalog run that keeps raw
+    responses with a projection_only run, using synthetic responses shaped
+    like the search and top tracks endpoints.
+
+    Usage:
+        python -m benchmarks.bench_projections [--artists 5000]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import jmespath
+
+from app.pipeline import projections
+from app.pipeline.spotify_adapter import SpotifyArtistManager
+
+
+def artist_object(name):
+    return {'id': f'id_{name}', 'name': name, 'genres': ['rock', 'indie'],
+            'popularity': 50, 'followers': {'href': None, 'total': 1000},
+            'images': [{'url': f'https://i.scdn.co/image/{name}_{size}', 'height': size,
+                        'width': size} for size in (640, 320, 160)],
+            'external_urls': {'spotify': f'https://open.spotify.com/artist/{name}'},
+            'type': 'artist', 'uri': f'spotify:artist:{name}'}
+
+
+def track_object(artist_id, i):
+    return {'id': f'{artist_id}_{i}', 'name': f'track {i}', 'duration_ms': 200000,
+            'album': {'id': f'album_{artist_id}', 'name': 'album', 'images': [
+                {'url': f'https://i.scdn.co/image/{artist_id}_{size}'} for size in (640, 300)]},
+            'artists': [{'id': artist_id, 'name': artist_id}],
+            'preview_url': f'https://p.scdn.co/mp3-preview/{artist_id}_{i}',
+            'uri': f'spotify:track:{artist_id}_{i}'}
+
+
+class SyntheticSpotify:
+    """
+        Returns search and top tracks responses without network calls.
+    """
+
+    def search(self, q=None, type=None):
+        name = q.split(': ', 1)[1]
+        return {'artists': {'items': [artist_object(name), artist_object(f'{name} tribute')],
+                            'total': 2, 'limit': 10, 'offset': 0}}
+
+    def artist_top_tracks(self, artist_id):
+        return {'tracks': [track_object(artist_id, i) for i in range(10)]}
+
+
+def time_expressions(responses, runs=5):
+    """
+        Return (string seconds, compiled seconds) projecting responses.
+    """
+
+    expression = ('artists.items[].{artist_name: name, genres: genres, spotify_id: id,'
+                  'popularity: popularity, followers: followers.total}')
+    timings = []
+    for project in (lambda each: jmespath.search(expression, each),
+                    projections.project_artists):
+        best = float('inf')
+        for _ in range(runs):
+            start = time.perf_counter()
+            for each in responses:
+                project(each)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+
+    return timings
+
+
+def catalog_run(artists, projection_only):
+    """
+        Return (seconds, peak bytes) of a catalog run through prepare_data.
+    """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    artist_mgr = SpotifyArtistManager(spotify=SyntheticSpotify(), artists=artists,
+                                      max_workers=1, projection_only=projection_only)
+    artist_mgr.get_artist_info()
+    artist_mgr.get_track_info()
+    artist_mgr.prepare_data()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def main(artists=5000):
+
+    names = [f'artist {i}' for i in range(artists)]
+    responses = [SyntheticSpotify().search(q=f'artist: {name}') for name in names]
+    string, compiled = time_expressions(responses)
+    print(f'{artists} search responses projected')
+    print(f'{"string":<10}{string * 1000:>10.1f} ms')
+    print(f'{"compiled":<10}{compiled * 1000:>10.1f} ms{string / compiled:>8.1f}x')
+
+    print(f'\n{"catalog run":<18}{"seconds":>10}{"peak MB":>10}')
+    for projection_only in (False, True):
+        seconds, peak = catalog_run(names, projection_only)
+        label = 'projection_only' if projection_only else 'raw responses'
+        print(f'{label:<18}{seconds:>10.2f}{peak / 2 ** 20:>10.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artists', type=int, default=5000)
+    args = parser.parse_args()
+    main(artists=args.artists)
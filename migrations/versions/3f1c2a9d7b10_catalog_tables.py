@@ -0,0 +1,65 @@
+"""catalog tables
+
+Revision ID: 3f1c2a9d7b10
+Revises: 
+Create Date: 2019-05-12 14:02:11.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('artist',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(length=20), nullable=True),
+    sa.Column('spotify_id', sa.String(length=25), nullable=True),
+    sa.Column('popularity', sa.Integer(), nullable=True),
+    sa.Column('followers', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('spotify_id')
+    )
+    op.create_table('concert',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(length=20), nullable=False),
+    sa.Column('show_date', sa.DateTime(), nullable=True),
+    sa.Column('show_location', sa.String(length=20), nullable=True),
+    sa.Column('show_info', sa.String(length=20), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('artist_name')
+    )
+    with op.batch_alter_table('concert', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_concert_show_date'), ['show_date'], unique=False)
+
+    op.create_table('artist_concert',
+    sa.Column('concert_id', sa.Integer(), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ),
+    sa.ForeignKeyConstraint(['concert_id'], ['concert.id'], )
+    )
+    op.create_table('track',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('track_id', sa.String(), nullable=True),
+    sa.Column('track_name', sa.String(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('track_id')
+    )
+
+
+def downgrade():
+    op.drop_table('track')
+    op.drop_table('artist_concert')
+    with op.batch_alter_table('concert', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_concert_show_date'))
+
+    op.drop_table('concert')
+    op.drop_table('artist')
@@ -0,0 +1,65 @@
+"""catalog lookup indexes
+
+Revision ID: 8a4e6d0c5f21
+Revises: 3f1c2a9d7b10
+Create Date: 2019-05-12 14:20:37.104552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6d0c5f21'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('artist', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_artist_artist_name'), ['artist_name'], unique=False)
+
+    with op.batch_alter_table('track', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_track_artist_id'), ['artist_id'], unique=False)
+
+    # Rebuild artist_concert with a composite primary key, dropping
+    # duplicate and half-empty links the old table allowed.
+    op.create_table('artist_concert_new',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('concert_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ),
+    sa.ForeignKeyConstraint(['concert_id'], ['concert.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'concert_id')
+    )
+    op.execute('INSERT INTO artist_concert_new (artist_id, concert_id) '
+               'SELECT DISTINCT artist_id, concert_id FROM artist_concert '
+               'WHERE artist_id IS NOT NULL AND concert_id IS NOT NULL')
+    op.drop_table('artist_concert')
+    op.rename_table('artist_concert_new', 'artist_concert')
+
+    # artist_id lookups use the primary key, concert_id needs its own index
+    with op.batch_alter_table('artist_concert', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_artist_concert_concert_id'), ['concert_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('artist_concert', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_artist_concert_concert_id'))
+
+    op.create_table('artist_concert_old',
+    sa.Column('concert_id', sa.Integer(), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ),
+    sa.ForeignKeyConstraint(['concert_id'], ['concert.id'], )
+    )
+    op.execute('INSERT INTO artist_concert_old (concert_id, artist_id) '
+               'SELECT concert_id, artist_id FROM artist_concert')
+    op.drop_table('artist_concert')
+    op.rename_table('artist_concert_old', 'artist_concert')
+
+    with op.batch_alter_table('track', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_track_artist_id'))
+
+    with op.batch_alter_table('artist', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_artist_artist_name'))
@@ -4,6 +4,8 @@
 
 import pdb
 import json
+import os
+import time
 import jmespath
 from datetime import datetime, timedelta
 
@@ -11,6 +13,7 @@ import pandas as pd
 import pytest
 from betamax import Betamax
 from betamax_serializers import pretty_json
+from requests import Response
 
 from config import base_dir
 from pathlib import WindowsPath
@@ -102,6 +105,91 @@ def track_tbl(memory_db):
 
 # Data Collection Fixtures
 
+PAGE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'pages', 'live-music.html')
+
+
+class FakeSession:
+    """
+        Stand-in for requests.Session serving content for every url.
+
+        Honors If-None-Match against etag, urls containing any of missing
+        answer 503. Request headers and urls are recorded.
+    """
+
+    def __init__(self, content, etag='"v1"', missing=()):
+        self.content = content
+        self.etag = etag
+        self.missing = missing
+        self.requests = []
+        self.urls = []
+        self.hooks = {'response': []}
+
+    def get(self, url, headers=None, **kwargs):
+        self.urls.append(url)
+        self.requests.append(headers or {})
+
+        response = Response()
+        response.url = url
+        response.encoding = 'utf-8'
+        response._content = b''
+        if any(each in url for each in self.missing):
+            response.status_code = 503
+        elif headers and headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.headers['ETag'] = self.etag
+            response._content = self.content
+
+        return response
+
+
+class FakeSpotify:
+    """
+        Stand-in for spotipy.Spotify with optional artificial latency.
+
+        Search finds one artist per name, except names starting with
+        'unknown'. Search queries are recorded in order.
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.queries = []
+
+    def search(self, q=None, type=None):
+        self.queries.append(q)
+        time.sleep(self.delay)
+        name = q.split(': ', 1)[1]
+        if name.startswith('unknown'):
+            return {'artists': {'items': []}}
+        return {'artists': {'items': [{'id': f'id_{name}', 'name': name, 'genres': [],
+                                       'popularity': 10, 'followers': {'total': 5}}]}}
+
+    def artist_top_tracks(self, artist_id):
+        time.sleep(self.delay)
+        return {'tracks': [{'id': f'track_{artist_id}', 'name': f'song {artist_id}'}]}
+
+
+@pytest.fixture
+def page():
+    """
+        Recorded Flagpole live-music listing.
+    """
+
+    with open(PAGE_PATH, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def fake_session():
+    return FakeSession
+
+
+@pytest.fixture
+def fake_spotify():
+    return FakeSpotify
+
+
 
 @pytest.mark.usefixtures('betamax_session')
 @pytest.fixture
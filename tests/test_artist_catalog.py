@@ -10,7 +10,8 @@ import pytest
 
 from app.models import Artist, Concert, Track
 from app.pipeline import data_collection, spotify_adapter
-from app.pipeline.data_collection import Catalog
+from app.pipeline.catalog_index import CatalogIndex
+from app.pipeline.data_collection import Catalog, Playlist
 
 
 class TestDatabase(object):
@@ -102,6 +103,62 @@ class TestDatabase(object):
         assert len(triage) == 0
         assert len(query) > 0
 
+    def test_catalog_load_skips_existing(self, memory_db, mocker):
+        """
+            Test Catalog load records only inserts new artists and tracks.
+        """
+
+        artist_data = [dict(artist_name=f'artist_{i}', spotify_id=f'artist_id_{i}',
+                            popularity=i, followers=i, genres=[]) for i in range(5)]
+        track_data = [[dict(track_id=f'track_id_{i}_{j}', track_name=f'track_{j}')
+                       for j in range(3)] for i in range(5)]
+
+        mocker.patch('app.pipeline.data_collection.spotify',
+                     artist_data=artist_data[:3], track_data=track_data[:3])
+        mocker.patch('app.pipeline.data_collection.db', new=memory_db)
+        Catalog(chunk_size=2).load_records()
+
+        mocker.patch('app.pipeline.data_collection.spotify',
+                     artist_data=artist_data, track_data=track_data)
+        triage = Catalog(chunk_size=2).load_records()
+
+        assert len(triage) == 0
+        assert memory_db.session.query(Artist).count() == 5
+        assert memory_db.session.query(Track).count() == 15
+        artist = memory_db.session.query(Artist).filter_by(spotify_id='artist_id_4').one()
+        assert sorted(track.track_id for track in artist.tracks) == [
+            f'track_id_4_{j}' for j in range(3)]
+
+    def test_catalog_index_incremental(self, memory_db, mocker):
+        """
+            Test Playlist track lookup against an index updated by load_records.
+        """
+
+        artist_data = [dict(artist_name=f'Artist {i}', spotify_id=f'artist_id_{i}',
+                            popularity=i, followers=i) for i in range(4)]
+        track_data = [[dict(track_id=f'track_id_{i}_{j}', track_name=f'track_{j}')
+                       for j in range(2)] for i in range(4)]
+        mocker.patch('app.pipeline.data_collection.db', new=memory_db)
+        mocker.patch('app.pipeline.catalog_index.db', new=memory_db)
+
+        index = CatalogIndex()
+        mocker.patch('app.pipeline.data_collection.spotify',
+                     artist_data=artist_data[:2], track_data=track_data[:2])
+        Catalog(index=index).load_records()
+        index.build()
+
+        mocker.patch('app.pipeline.data_collection.spotify',
+                     artist_data=artist_data, track_data=track_data)
+        Catalog(index=index).load_records()
+
+        # no queries once the index is built
+        query = mocker.spy(memory_db.session, 'query')
+        playlist = Playlist(catalog=index)
+        track_ids = playlist.query_catalog(['artist 3', 'unknown', 'ARTIST\xa00'])
+
+        assert track_ids == ['track_id_3_0', 'track_id_3_1', 'track_id_0_0', 'track_id_0_1']
+        assert query.call_count == 0
+
 
 # def test_spotify_adapter(spotify_response):
 
@@ -0,0 +1,89 @@
+"""
+    ResponseArchive tests.
+"""
+
+import threading
+
+from app.pipeline.archive import ResponseArchive, iter_records, segment_paths
+from app.pipeline.spotify_adapter import SpotifyArtistManager
+
+
+def test_append_and_iter_records(tmp_path):
+
+    with ResponseArchive(str(tmp_path), run_id='run1') as archive:
+        archive.append('search', 'key1', {'artists': {'items': []}})
+        archive.append('artist_top_tracks', 'key2', {'tracks': [{'id': 't1'}]})
+
+    records = list(iter_records(str(tmp_path)))
+
+    assert [each['endpoint'] for each in records] == ['search', 'artist_top_tracks']
+    assert {each['run_id'] for each in records} == {'run1'}
+    assert records[1]['response'] == {'tracks': [{'id': 't1'}]}
+    assert 'timestamp' in records[0]
+    assert [each['key'] for each in iter_records(str(tmp_path), endpoint='search')] == ['key1']
+
+
+def test_segments_rotate_by_size(tmp_path):
+
+    with ResponseArchive(str(tmp_path), run_id='run1', max_segment_bytes=1,
+                         compresslevel=1) as archive:
+        for i in range(5):
+            archive.append('search', f'key{i}', {'i': i})
+
+    assert len(segment_paths(str(tmp_path))) == 5
+    assert [each['response']['i'] for each in iter_records(str(tmp_path))] == list(range(5))
+
+
+def test_runs_filtered_and_appended(tmp_path):
+
+    for run_id in ('run1', 'run2'):
+        with ResponseArchive(str(tmp_path), run_id=run_id) as archive:
+            archive.append('search', run_id, {})
+
+    assert [each['key'] for each in iter_records(str(tmp_path))] == ['run1', 'run2']
+    assert [each['key'] for each in iter_records(str(tmp_path), run_id='run2')] == ['run2']
+
+
+def test_truncated_segment_yields_complete_records(tmp_path):
+
+    with ResponseArchive(str(tmp_path), run_id='run1', compresslevel=0) as archive:
+        for i in range(100):
+            archive.append('search', f'key{i}', {'padding': 'x' * 100})
+        path = archive.segment_path
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    with open(path, 'wb') as f:
+        f.write(content[:len(content) // 2])
+
+    records = list(iter_records(str(tmp_path)))
+    assert 0 < len(records) < 100
+
+
+def test_concurrent_appends(tmp_path):
+
+    archive = ResponseArchive(str(tmp_path), run_id='run1')
+    threads = [threading.Thread(target=lambda n=n: [archive.append('search', f'{n}_{i}', {})
+                                                    for i in range(50)])
+               for n in range(4)]
+    for each in threads:
+        each.start()
+    for each in threads:
+        each.join()
+    archive.close()
+
+    assert archive.records == 200
+    assert len(list(iter_records(str(tmp_path)))) == 200
+
+
+def test_artist_manager_archives_responses(tmp_path, fake_spotify):
+
+    with ResponseArchive(str(tmp_path), run_id='run1') as archive:
+        artist_mgr = SpotifyArtistManager(spotify=fake_spotify(), artists=['band'],
+                                          archive=archive)
+        artist_mgr.get_artist_info()
+
+    record, = iter_records(str(tmp_path), endpoint='search')
+    assert record['endpoint'] == 'search'
+    assert record['response'] == artist_mgr.artist_response[0]
+    assert 'artist: band' in record['key']
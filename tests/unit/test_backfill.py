@@ -0,0 +1,98 @@
+"""
+    Historical backfill tests.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from app.pipeline import backfill as backfill_module
+from app.pipeline.backfill import Backfill
+from app.pipeline.data_collection import parse_show_date
+
+
+def test_backfill_resumes_from_checkpoint(page, tmp_path, fake_session):
+
+    checkpoint_path = str(tmp_path / 'checkpoint.jsonl')
+    start, end = date(2018, 4, 30), date(2018, 5, 14)
+
+    session = fake_session(page, missing=('2018-05-07',))
+    backfill = Backfill(start, end, checkpoint_path=checkpoint_path,
+                        session=session, processes=1, max_workers=2)
+    concerts = backfill.run()
+
+    assert len(session.urls) == 3
+    assert backfill.failed == [date(2018, 5, 7)]
+    assert len(concerts['concerts']) == 6
+    assert concerts['concerts'][0]['date_time'] == datetime(2018, 5, 10)
+
+    # only the failed page is fetched again
+    session = fake_session(page)
+    backfill = Backfill(start, end, checkpoint_path=checkpoint_path,
+                        session=session, processes=1)
+    assert len(backfill.run()['concerts']) == 3
+    assert session.urls == [
+        'http://www.flagpole.com/events/live-music?date=2018-05-07']
+
+
+class CountingPool(ThreadPoolExecutor):
+    """
+        Thread pool standing in for the process pool, counts unfinished parses.
+    """
+
+    peak = 0
+
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.outstanding = 0
+
+    def submit(self, fn, *args, **kwargs):
+
+        def done(future):
+            with self.lock:
+                self.outstanding -= 1
+
+        with self.lock:
+            self.outstanding += 1
+            CountingPool.peak = max(CountingPool.peak, self.outstanding)
+        future = super().submit(fn, *args, **kwargs)
+        future.add_done_callback(done)
+        return future
+
+
+def test_backfill_caps_pending_parses(page, tmp_path, mocker, fake_session):
+
+    parse_page = backfill_module.parse_page
+
+    def slow_parse(*args):
+        time.sleep(0.02)
+        return parse_page(*args)
+
+    mocker.patch('app.pipeline.backfill.ProcessPoolExecutor', CountingPool)
+    mocker.patch('app.pipeline.backfill.parse_page', slow_parse)
+    CountingPool.peak = 0
+
+    backfill = Backfill(date(2018, 1, 1), date(2018, 3, 1),
+                        checkpoint_path=str(tmp_path / 'checkpoint.jsonl'),
+                        session=fake_session(page), processes=1, max_workers=4, max_pending=2)
+    backfill.run()
+
+    assert len(backfill.checkpoint.completed) == 9
+    assert CountingPool.peak <= 2
+
+
+def test_parse_show_date_year_wrap():
+
+    assert parse_show_date('Friday, May 10', reference=date(2019, 5, 1)) == datetime(2019, 5, 10)
+    assert parse_show_date('Friday, January 3', reference=date(2019, 12, 20)) == datetime(2020, 1, 3)
+
+
+def test_parse_show_date_leap_day():
+
+    # headings are parsed before the year is known, a 2019 or 2021 page still
+    # places the show in 2020
+    assert parse_show_date('Saturday, February 29', reference=date(2019, 12, 20)) == datetime(2020, 2, 29)
+    assert parse_show_date('Saturday, February 29', reference=date(2020, 2, 1)) == datetime(2020, 2, 29)
+    assert parse_show_date('Saturday, February 29', reference=date(2021, 1, 5)) == datetime(2020, 2, 29)
@@ -0,0 +1,85 @@
+"""
+    ConcertManager tests.
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app.pipeline.data_collection import ConcertManager
+from app.pipeline.spotify_adapter import SpotifyArtistManager
+
+
+def make_concerts(today=None):
+
+    today = today or datetime.today()
+    return {'concerts': [
+        {'date_time': today, 'show_venue': '40 Watt Club',
+         'show_artists': ['Futurebirds', 'The\xa0Whigs '], 'show_info': '9pm'},
+        {'date_time': today + timedelta(days=1), 'show_venue': 'Georgia Theatre',
+         'show_artists': [], 'show_info': '8pm'},
+        {'date_time': today + timedelta(days=30), 'show_venue': 'Caledonia Lounge',
+         'show_artists': ['futurebirds', 'Elf  Power'], 'show_info': '10pm'},
+    ]}
+
+
+def test_artists_extracted_once():
+
+    concert_mgr = ConcertManager(concerts=make_concerts())
+
+    assert concert_mgr.artists == ['futurebirds', 'the whigs', 'elf power']
+    assert len(concert_mgr.artist_df) == 4
+    assert isinstance(concert_mgr.artist_df['artist_name'].dtype, pd.CategoricalDtype)
+
+
+def test_weekly_schedule():
+
+    concert_mgr = ConcertManager(concerts=make_concerts())
+    concert_mgr.create_weekly_schedule()
+
+    assert concert_mgr.weekly_artists == ['futurebirds', 'the whigs']
+
+
+def test_no_concerts():
+
+    concert_mgr = ConcertManager(concerts={'concerts': []})
+
+    assert concert_mgr.artists == []
+
+
+def test_schedule_windows():
+
+    today = datetime(2019, 5, 8)  # Wednesday
+    concerts = make_concerts(today=today)
+    # scraped out of order
+    concerts['concerts'].append({'date_time': datetime(2019, 5, 11), 'show_venue': 'Flicker',
+                                 'show_artists': ['Pylon'], 'show_info': ''})
+    concert_mgr = ConcertManager(concerts=concerts)
+
+    assert concert_mgr.df.index.is_monotonic_increasing
+    weekend = ConcertManager.get_weekend_range(today=today)
+    assert weekend == (datetime(2019, 5, 10), datetime(2019, 5, 13))
+
+    schedules = concert_mgr.get_schedules({
+        'next_weekend': weekend,
+        'rest_of_week': (today, datetime(2019, 5, 13)),
+        'later': (datetime(2019, 5, 13), None)})
+
+    assert schedules['next_weekend'] == ['pylon']
+    assert schedules['rest_of_week'] == ['futurebirds', 'the whigs', 'pylon']
+    assert schedules['later'] == ['futurebirds', 'elf power']
+    assert len(concert_mgr.get_shows(today, datetime(2019, 5, 10))) == 2
+
+
+def test_scraped_names_searched_unchanged(fake_spotify):
+
+    concerts = {'concerts': [
+        {'date_time': datetime(2019, 5, 10), 'show_venue': 'Flicker',
+         'show_artists': ['The Band', '!!!', 'The The', 'Sigur\xa0Rós'], 'show_info': ''}]}
+    concert_mgr = ConcertManager(concerts=concerts)
+
+    assert concert_mgr.artists == ['the band', '!!!', 'the the', 'sigur rós']
+    spotify = fake_spotify()
+    artist_mgr = SpotifyArtistManager(spotify=spotify, artists=concert_mgr.artists, max_workers=1)
+    artist_mgr.get_artist_info()
+    assert spotify.queries == ['artist: the band', 'artist: !!!', 'artist: the the', 'artist: sigur rós']
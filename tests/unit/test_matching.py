@@ -0,0 +1,43 @@
+"""
+    Artist name matching tests.
+"""
+
+import pandas as pd
+import pytest
+
+from app.pipeline.matching import NameIndex, normalize_name
+from app.pipeline.spotify_adapter import SpotifyArtistManager
+
+
+@pytest.mark.parametrize('name, key', [
+    ('The Whigs', 'whigs'),
+    ('The\xa0Whigs ', 'whigs'),
+    ('Drive-By  Truckers', 'drive by truckers'),
+    ('Beyoncé', 'beyonce'),
+    ('Simon & Garfunkel', 'simon and garfunkel'),
+    ('Theory of a Deadman', 'theory of a deadman'),
+])
+def test_normalize_name(name, key):
+    assert normalize_name(name) == key
+
+
+def test_name_index_fuzzy_match():
+
+    index = NameIndex(['futurebirds', 'drive-by truckers', 'elf power'], threshold=0.7)
+
+    assert index.match('Drive By Truckers') == ('drive-by truckers', 1.0)
+    name, confidence = index.match('Future Birds')
+    assert name == 'futurebirds' and 0.7 <= confidence < 1
+    assert index.match('Widespread Panic')[0] is None
+
+
+def test_check_artist_names():
+
+    artist_mgr = SpotifyArtistManager(artists=['the whigs', 'pylon', 'elf power'])
+    df = pd.DataFrame({'artist_name': ['Whigs', 'Pylon', 'Elf Powers', 'Pylon Reenactment'],
+                       'followers': [1, 2, 3, 4]})
+    checked = artist_mgr.check_artist_names(df)
+
+    assert checked['artist_name'].tolist() == ['the whigs', 'pylon', 'elf power']
+    assert checked['match_confidence'].tolist()[:2] == [1.0, 1.0]
+    assert artist_mgr.name_index is artist_mgr.name_index
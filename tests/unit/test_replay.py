@@ -0,0 +1,104 @@
+"""
+    Offline replay tests.
+"""
+
+import pytest
+
+from app.models import Artist, Track
+from app.pipeline import data_collection
+from app.pipeline.archive import ResponseArchive
+from app.pipeline.data_collection import ConcertManager, create_spotify, scrape_sources
+from app.pipeline.replay import ReplayMiss, ReplaySpotify, UnlimitedScheduler, replay_pipeline
+from app.pipeline.response_cache import NegativeCache
+from app.pipeline.spotify_adapter import SpotipyAdapter
+
+
+def archive_run(directory, session, spotify, negative_cache=None):
+    """
+        Archive a live run against fakes, return the live adapter.
+    """
+
+    with ResponseArchive(directory, run_id='run1') as archive:
+        concerts, _ = scrape_sources(session=session, sources=['flagpole'],
+                                     options={'flagpole': {'archive': archive}}, state_dir=None,
+                                     archive_dir=None)
+        adapter = SpotipyAdapter(scheduler=UnlimitedScheduler(), playlist_cache_path=None,
+                                 archive=archive, negative_cache=negative_cache)
+        adapter.spotify = spotify
+        adapter.get_catalog_data(ConcertManager(concerts=concerts).artists)
+
+    return adapter
+
+
+@pytest.fixture
+def archived_run(tmp_path, page, fake_session, fake_spotify):
+
+    directory = str(tmp_path / 'archive')
+    return directory, archive_run(directory, fake_session(page), fake_spotify())
+
+
+def test_replay_matches_live_run(archived_run, memory_db, mocker):
+
+    directory, live = archived_run
+    mocker.patch('app.pipeline.data_collection.db', new=memory_db)
+
+    result = replay_pipeline(directory)
+
+    assert result['run_id'] == 'run1'
+    assert len(result['concerts']['concerts']) == 3
+    assert result['adapter'].artist_data == live.artist_data
+    assert result['adapter'].track_data == live.track_data
+    assert memory_db.session.query(Artist).count() == len(live.artist_data)
+    assert memory_db.session.query(Track).count() == len(live.artist_data)
+    assert set(result['seconds']) == {'scrape', 'concerts', 'catalog_data', 'load'}
+
+
+def test_replay_spotify_miss():
+
+    spotify = ReplaySpotify({})
+
+    with pytest.raises(ReplayMiss):
+        spotify.search(q='artist: nobody', type='artist')
+
+
+def test_replay_skips_negative_cache_hits(tmp_path, memory_db, mocker, page, fake_session,
+                                          fake_spotify):
+
+    mocker.patch('app.pipeline.data_collection.db', new=memory_db)
+    directory = str(tmp_path / 'archive')
+    negative_cache = NegativeCache(str(tmp_path / 'negative.sqlite'))
+    concerts, _ = scrape_sources(session=fake_session(page), sources=['flagpole'],
+                                 state_dir=None, archive_dir=None)
+    artists = ConcertManager(concerts=concerts).artists
+    negative_cache.record_miss(artists[0])
+
+    live = archive_run(directory, fake_session(page), fake_spotify(),
+                       negative_cache=negative_cache)
+    result = replay_pipeline(directory)
+
+    assert len(live.artist_data) == len(artists) - 1
+    assert result['adapter'].artist_data == live.artist_data
+    assert result['adapter'].spotify.calls == 2 * len(live.artist_data)
+
+
+def test_default_run_is_replayable(tmp_path, memory_db, mocker, page, fake_session,
+                                   fake_spotify):
+
+    mocker.patch('app.pipeline.data_collection.db', new=memory_db)
+    mocker.patch.object(SpotipyAdapter, 'authenticate_user', autospec=True,
+                        side_effect=lambda self: self)
+    directory = str(tmp_path / 'archive')
+
+    # pages and responses land in the one archive run of this process
+    concerts, _ = scrape_sources(session=fake_session(page), sources=['flagpole'],
+                                 state_dir=None, archive_dir=directory)
+    live = create_spotify(cache_path=str(tmp_path / 'cache.sqlite'), archive_dir=directory)
+    live.spotify = fake_spotify()
+    live.get_catalog_data(ConcertManager(concerts=concerts).artists)
+    assert live.cache is not None and live.negative_cache is not None
+    data_collection.archives.pop(directory).close()
+
+    result = replay_pipeline(directory)
+
+    assert result['adapter'].artist_data == live.artist_data
+    assert result['adapter'].track_data == live.track_data
@@ -0,0 +1,95 @@
+"""
+    Spotify response cache tests.
+"""
+
+import sqlite3
+
+from app.pipeline.matching import NORMALIZER_VERSION
+from app.pipeline.response_cache import NegativeCache, ResponseCache
+
+
+def test_cached_hit_and_miss():
+
+    calls = []
+
+    def search(q=None, type=None):
+        calls.append(q)
+        return {'artists': {'items': [q]}}
+
+    cache = ResponseCache(path=':memory:')
+    first = cache.cached('search', search, q='artist: a', type='artist')
+    second = cache.cached('search', search, q='artist: a', type='artist')
+
+    assert first == second
+    assert calls == ['artist: a']
+    assert cache.stats()['hits'] == {'search': 1}
+    assert cache.stats()['misses'] == {'search': 1}
+
+
+def test_expired_entries_are_refetched():
+
+    cache = ResponseCache(path=':memory:', ttl={'search': -1})
+    key = cache.make_key(q='a')
+    cache.set('search', key, {'value': 1})
+
+    assert cache.get('search', key) is None
+
+
+def test_eviction_keeps_size_bounded(tmp_path):
+
+    cache = ResponseCache(path=tmp_path / 'cache.sqlite', max_entries=10)
+    for i in range(25):
+        cache.set('search', cache.make_key(i), {'value': i})
+
+    assert cache.stats()['size'] <= 10
+    # most recent writes survive
+    assert cache.get('search', cache.make_key(24)) == {'value': 24}
+
+    cache.close()
+    reopened = ResponseCache(path=tmp_path / 'cache.sqlite', max_entries=10)
+    assert reopened.get('search', cache.make_key(24)) == {'value': 24}
+
+
+def test_negative_cache_back_off(mocker):
+
+    clock = mocker.patch('app.pipeline.response_cache.time')
+    clock.time.return_value = 0
+
+    cache = NegativeCache(path=':memory:', base_ttl=10, max_ttl=25)
+    cache.record_miss('Open\xa0Mic ')
+    assert cache.is_known_miss('open mic')
+
+    clock.time.return_value = 11
+    assert not cache.is_known_miss('open mic')
+
+    # second miss doubles the back-off, third is capped
+    cache.record_miss('open mic')
+    clock.time.return_value = 30
+    assert cache.is_known_miss('open mic')
+    cache.record_miss('open mic')
+    clock.time.return_value = 56
+    assert not cache.is_known_miss('open mic')
+
+    cache.record_hit('Open Mic')
+    assert cache.stats() == {'skipped': 2, 'size': 0}
+
+
+def test_negative_cache_rekeys_old_normalizer_rows(tmp_path):
+
+    path = str(tmp_path / 'cache.sqlite')
+    # table written before keys were versioned, keys only case folded
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE negative_cache (name TEXT PRIMARY KEY, misses INTEGER NOT NULL,'
+                 ' checked_at REAL NOT NULL, retry_at REAL NOT NULL)')
+    conn.executemany('INSERT INTO negative_cache VALUES (?, ?, ?, ?)',
+                     [('the drive-by truckers', 1, 0, 2e10), ('drive by truckers', 3, 5, 1e10)])
+    conn.commit()
+    conn.close()
+
+    cache = NegativeCache(path=path)
+
+    assert cache.stats()['size'] == 1
+    assert cache.is_known_miss('Drive-By Truckers')
+    assert cache.migrate() == 0
+    row = cache._conn.execute('SELECT * FROM negative_cache').fetchone()
+    assert row == ('drive by truckers', 3, 5, 2e10, NORMALIZER_VERSION)
@@ -0,0 +1,97 @@
+"""
+    Spotify request scheduler tests.
+"""
+
+import time
+
+import pytest
+from requests import Response
+
+from app.pipeline.scheduler import RequestScheduler, ScheduledClient, schedule
+
+
+class RateLimited(Exception):
+
+    def __init__(self, headers=None):
+        super().__init__('429')
+        self.http_status = 429
+        self.headers = headers
+
+
+def test_token_bucket_limits_rate():
+
+    scheduler = RequestScheduler(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        scheduler.call(lambda: None)
+
+    # 1 token up front, 5 more at 50/s
+    assert time.monotonic() - start >= 0.09
+    assert scheduler.metrics()['calls'] == 6
+    assert scheduler.metrics()['throttle_time'] > 0
+
+
+def test_retry_after_pauses_and_retries():
+
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RateLimited(headers={'Retry-After': '0.1'})
+        return 'ok'
+
+    scheduler = RequestScheduler(rate=100)
+    assert scheduler.call(flaky) == 'ok'
+    assert attempts[1] - attempts[0] >= 0.1
+    assert scheduler.metrics()['rate_limited'] == 1
+
+
+def test_hooked_429_pauses_once():
+
+    scheduler = RequestScheduler(rate=100)
+    response = Response()
+    response.status_code = 429
+    response.headers['Retry-After'] = '0.1'
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            # the session hook sees the response before spotipy raises
+            scheduler.response_hook(response)
+            raise RateLimited(headers={'Retry-After': '0.1'})
+        return 'ok'
+
+    assert scheduler.call(flaky) == 'ok'
+    assert 0.1 <= attempts[1] - attempts[0] < 0.2
+    assert scheduler.metrics()['rate_limited'] == 1
+
+
+def test_retries_exhausted():
+
+    def always_limited():
+        raise RateLimited(headers={'Retry-After': '0'})
+
+    scheduler = RequestScheduler(rate=100, max_retries=2)
+    with pytest.raises(RateLimited):
+        scheduler.call(always_limited)
+    assert scheduler.metrics()['calls'] == 3
+
+
+def test_scheduled_client_proxies_calls():
+
+    class Client:
+        market = 'US'
+
+        def search(self, q=None):
+            return q
+
+    scheduler = RequestScheduler(rate=100)
+    client = schedule(Client(), scheduler)
+
+    assert isinstance(client, ScheduledClient)
+    assert client.search(q='artist') == 'artist'
+    assert client.market == 'US'
+    assert schedule(client, scheduler) is client
+    assert scheduler.metrics()['calls'] == 1
@@ -0,0 +1,146 @@
+"""
+    Flagpole Scraper tests.
+"""
+
+import json
+import time
+
+from app.pipeline.data_collection import PARSERS, SCRAPERS, Scraper, scrape_sources
+
+
+def scrape(session, state_path):
+    scraper = Scraper(session=session, state_path=state_path)
+    scraper.get_response()
+    concerts = scraper.get_concerts()
+    scraper.save_state()
+    return concerts, scraper.parsed_days
+
+
+def test_parse_page(page, tmp_path, fake_session):
+
+    concerts = scrape(fake_session(page), str(tmp_path / 'state.json'))[0]['concerts']
+
+    assert [each['show_venue'] for each in concerts] == [
+        '40 Watt Club', 'Georgia Theatre', 'Caledonia Lounge']
+    assert concerts[0]['show_artists'][0] == 'Futurebirds'
+    assert len(concerts[0]['show_artists']) == 2
+
+
+def test_not_modified_skips_parse(page, tmp_path, fake_session):
+
+    state_path = str(tmp_path / 'state.json')
+    session = fake_session(page)
+    first, _ = scrape(session, state_path)
+
+    concerts, parsed_days = scrape(session, state_path)
+    assert session.requests[-1]['If-None-Match'] == '"v1"'
+    assert parsed_days == set()
+    assert concerts == first
+
+
+def test_legacy_state_parsed_in_full(page, tmp_path, fake_session):
+
+    state_path = str(tmp_path / 'state.json')
+    first, _ = scrape(fake_session(page), state_path)
+
+    # state written before shows were cached
+    with open(state_path) as f:
+        state = json.load(f)
+    state[Scraper.url] = {key: state[Scraper.url][key] for key in ('etag', 'content_hash')}
+    with open(state_path, 'w') as f:
+        json.dump(state, f)
+
+    session = fake_session(page)
+    concerts, parsed_days = scrape(session, state_path)
+    assert 'If-None-Match' not in session.requests[-1]
+    assert len(parsed_days) == 2
+    assert concerts == first
+
+
+def test_only_changed_days_parsed(page, tmp_path, fake_session):
+
+    state_path = str(tmp_path / 'state.json')
+    first, parsed_days = scrape(fake_session(page), state_path)
+    assert len(parsed_days) == 2
+
+    # new ETag, same first day, edited second day
+    edited = page.replace(b'Pylon Reenactment Society', b'Pylon Reenactment Society</strong>'
+                          b'</p><p><strong>Elf Power')
+    concerts, parsed_days = scrape(fake_session(edited, etag='"v2"'), state_path)
+
+    # every show is returned, only the edited day was parsed
+    assert len(parsed_days) == 1
+    assert concerts['concerts'][:2] == first['concerts'][:2]
+    assert [each['show_venue'] for each in concerts['concerts']] == [
+        '40 Watt Club', 'Georgia Theatre', 'Caledonia Lounge']
+    assert concerts['concerts'][2]['show_artists'] == ['Pylon Reenactment Society', 'Elf Power']
+    assert concerts == PARSERS['soup'].parse(PARSERS['soup'].event_list(edited))
+
+    # new ETag, identical event list
+    unchanged, parsed_days = scrape(fake_session(edited, etag='"v3"'), state_path)
+    assert parsed_days == set()
+    assert unchanged == concerts
+
+
+def test_parser_engines_match(page):
+
+    soup = PARSERS['soup']
+    fast = PARSERS['lxml']
+
+    expected = soup.parse(soup.event_list(page))
+    assert fast.parse(fast.event_list(page)) == expected
+    assert [day for day, _ in fast.day_blocks(fast.event_list(page))] == [
+        day for day, _ in soup.day_blocks(soup.event_list(page))]
+
+
+def test_lxml_engine_conditional(page, tmp_path, fake_session):
+
+    state_path = str(tmp_path / 'state.json')
+    scraper = Scraper(session=fake_session(page), state_path=state_path, parser='lxml')
+    scraper.get_response()
+
+    assert len(scraper.get_concerts()['concerts']) == 3
+    assert len(scraper.get_concerts()['concerts']) == 3
+    assert scraper.parsed_days == set()
+
+
+def test_scrape_sources_isolates_failures(page, mocker, fake_session):
+
+    class BrokenScraper(Scraper):
+        url = 'http://example.com/broken'
+
+        def get_concerts(self):
+            raise ValueError('layout changed')
+
+    class SlowScraper(Scraper):
+        url = 'http://example.com/slow'
+
+        def get_response(self):
+            time.sleep(1)
+
+    mocker.patch.dict(SCRAPERS, {'flagpole': Scraper, 'broken': BrokenScraper,
+                                 'slow': SlowScraper}, clear=True)
+
+    concerts, report = scrape_sources(session=fake_session(page), timeout=0.5, state_dir=None,
+                                      archive_dir=None)
+    report = {each['source']: each for each in report}
+
+    assert len(concerts['concerts']) == 3
+    assert {each['source'] for each in concerts['concerts']} == {'flagpole'}
+    assert report['flagpole']['shows'] == 3
+    assert isinstance(report['broken']['error'], ValueError)
+    assert isinstance(report['slow']['error'], TimeoutError)
+
+
+def test_scrape_sources_saves_state(page, tmp_path, mocker, fake_session):
+
+    mocker.patch.dict(SCRAPERS, {'flagpole': Scraper}, clear=True)
+    session = fake_session(page)
+    state_dir = str(tmp_path / 'state')
+
+    first, _ = scrape_sources(session=session, state_dir=state_dir, archive_dir=None)
+    second, report = scrape_sources(session=session, state_dir=state_dir, archive_dir=None)
+
+    assert session.requests[-1]['If-None-Match'] == '"v1"'
+    assert report[0]['scraper'].not_modified
+    assert second == first
@@ -0,0 +1,109 @@
+"""
+    Parquet snapshot tests.
+"""
+
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from app.models import Artist, Concert, Track
+from app.pipeline.catalog_index import CatalogIndex
+from app.pipeline.data_collection import Catalog
+from app.pipeline.snapshots import (export_snapshots, load_history, load_snapshot, snapshot_dates,
+                                    table_schema, to_arrow)
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def catalog_db(memory_db):
+
+    memory_db.session.bulk_insert_mappings(Artist, [
+        dict(artist_name=f'artist_{i}', spotify_id=f'id_{i}', popularity=i,
+             followers=None if i == 0 else i * 10 ** 7) for i in range(20)])
+    memory_db.session.bulk_insert_mappings(Track, [
+        dict(track_id=f'track_{i}', track_name=f'song_{i}', artist_id=i % 20 + 1)
+        for i in range(40)])
+    memory_db.session.bulk_insert_mappings(Concert, [
+        dict(artist_name=f'show_{i}', show_date=datetime(2019, 5, 1 + i),
+             show_location=['40 Watt Club', 'Georgia Theatre'][i % 2], show_info='$10')
+        for i in range(10)])
+    memory_db.session.commit()
+
+    return memory_db
+
+
+def test_to_arrow_lossless():
+
+    df = pd.DataFrame({'id': [1, 2, 3], 'artist_name': ['a', 'b', 'c'],
+                       'spotify_id': ['x', 'y', 'z'], 'popularity': [1, 2, 3],
+                       'followers': [10.0, None, 2.0 ** 24 + 1]})
+
+    arrow_table = to_arrow(df, 'artist')
+    followers = arrow_table.to_pandas()['followers']
+
+    assert arrow_table.schema == table_schema('artist')
+    assert str(arrow_table.schema.field('followers').type) == 'int32'
+    assert followers.dtype == 'float64'
+    assert followers[2] == 2 ** 24 + 1
+    assert pd.isnull(followers[1])
+
+
+def test_concert_strings_dictionary_encoded():
+
+    assert str(table_schema('concert').field('show_location').type).startswith('dictionary')
+    assert str(table_schema('artist').field('artist_name').type) == 'string'
+
+
+def test_export_and_load(catalog_db, tmp_path, mocker):
+
+    mocker.patch('app.pipeline.snapshots.db', new=catalog_db)
+    directory = str(tmp_path)
+
+    export_snapshots(directory, scrape_date=date(2019, 5, 1))
+    catalog_db.session.query(Artist).filter_by(spotify_id='id_5').update({'popularity': 99})
+    catalog_db.session.commit()
+    export_snapshots(directory, scrape_date=date(2019, 5, 8))
+
+    assert snapshot_dates('artist', directory) == [date(2019, 5, 1), date(2019, 5, 8)]
+
+    artists = load_snapshot('artist', directory=directory)
+    assert len(artists) == 20
+    assert artists.loc[artists['spotify_id'] == 'id_5', 'popularity'].item() == 99
+    assert pd.isnull(artists.loc[artists['spotify_id'] == 'id_0', 'followers'].item())
+    assert artists.loc[artists['spotify_id'] == 'id_19', 'followers'].item() == 19 * 10 ** 7
+
+    first = load_snapshot('artist', scrape_date=date(2019, 5, 1), directory=directory,
+                          columns=['spotify_id', 'popularity'])
+    assert list(first.columns) == ['spotify_id', 'popularity']
+    assert first.loc[first['spotify_id'] == 'id_5', 'popularity'].item() == 5
+
+    history = load_history('artist', directory=directory, columns=['spotify_id', 'popularity'])
+    assert len(history) == 40
+    assert history.loc[history['spotify_id'] == 'id_5', 'popularity'].tolist() == [5, 99]
+    assert sorted(history['scrape_date'].astype(str).unique()) == [
+        '2019-05-01', '2019-05-08']
+
+    concerts = load_snapshot('concert', directory=directory)
+    assert concerts['show_location'].dtype.name == 'category'
+    assert len(load_snapshot('track', directory=directory)) == 40
+
+
+def test_load_missing_snapshot(tmp_path):
+
+    with pytest.raises(FileNotFoundError):
+        load_snapshot('artist', directory=str(tmp_path))
+
+
+def test_catalog_load_exports_snapshots(memory_db, tmp_path, mocker):
+
+    mocker.patch('app.pipeline.data_collection.db', new=memory_db)
+    mocker.patch('app.pipeline.snapshots.db', new=memory_db)
+    spotify = mocker.Mock(artist_data=[dict(artist_name='band', spotify_id='id_1',
+                                            popularity=1, followers=1)],
+                          track_data=[[dict(track_id='track_1', track_name='song')]])
+
+    Catalog(spotify=spotify, index=CatalogIndex(), snapshot_dir=str(tmp_path)).load_records()
+
+    assert load_snapshot('track', directory=str(tmp_path))['track_id'].tolist() == ['track_1']
@@ -0,0 +1,291 @@
+"""
+    SpotifyArtistManager tests.
+"""
+
+import time
+
+import pandas as pd
+import pytest
+
+from app.pipeline import spotify_adapter
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_get_artist_info_keeps_order(max_workers, fake_spotify):
+
+    artists = ['band_1', 'unknown_1', 'band_2', 'band_3', 'unknown_2', 'band_4']
+    artist_mgr = spotify_adapter.SpotifyArtistManager(
+        spotify=fake_spotify(delay=0.01), artists=artists, max_workers=max_workers,
+        max_in_flight=2)
+    artist_mgr.get_artist_info()
+
+    names = [each['artists']['items'][0]['name'] for each in artist_mgr.artist_response]
+    assert names == ['band_1', 'band_2', 'band_3', 'band_4']
+
+
+def test_get_track_info_aligned(fake_spotify):
+
+    class TrackSpotify(fake_spotify):
+
+        def artist_top_tracks(self, artist_id):
+            # later ids return first
+            time.sleep(self.delay / (1 + int(artist_id.rsplit('_', 1)[1])))
+            return {'tracks': [{'id': f'track_{artist_id}', 'name': artist_id}]}
+
+    artists = [f'band_{i}' for i in range(10)]
+    artist_mgr = spotify_adapter.SpotifyArtistManager(
+        spotify=TrackSpotify(delay=0.01), artists=artists, max_workers=4)
+    artist_mgr.get_artist_info()
+    artist_mgr.get_track_info()
+
+    track_ids = [each['tracks'][0]['id'] for each in artist_mgr.track_response]
+    assert track_ids == [f'track_id_band_{i}' for i in range(10)]
+
+
+def test_projection_only_matches_full_responses(fake_spotify):
+
+    class TrackSpotify(fake_spotify):
+
+        def artist_top_tracks(self, artist_id):
+            return {'tracks': [{'id': f'track_{artist_id}', 'name': artist_id,
+                                'album': {'images': []}}]}
+
+    artists = ['band_1', 'unknown_1', 'band_2']
+    results = []
+    for projection_only in (False, True):
+        artist_mgr = spotify_adapter.SpotifyArtistManager(
+            spotify=TrackSpotify(), artists=artists, projection_only=projection_only)
+        artist_mgr.get_artist_info()
+        artist_mgr.get_track_info()
+        artist_mgr.prepare_data()
+        results.append((artist_mgr.artist_info, artist_mgr.track_info))
+
+    assert results[0] == results[1]
+    assert results[1][1] == [[{'track_id': 'track_id_band_1', 'track_name': 'id_band_1'}],
+                             [{'track_id': 'track_id_band_2', 'track_name': 'id_band_2'}]]
+    assert artist_mgr.artist_response is None and artist_mgr.track_response is None
+
+
+def test_get_artist_stats_chunks(fake_spotify):
+
+    class SeveralSpotify(fake_spotify):
+
+        def __init__(self):
+            super().__init__()
+            self.calls = []
+
+        def artists(self, artist_ids):
+            self.calls.append(list(artist_ids))
+            return {'artists': [None if each == 'gone' else
+                                {'id': each, 'popularity': 1, 'followers': {'total': 2}}
+                                for each in artist_ids]}
+
+    spotify = SeveralSpotify()
+    spotify_ids = [f'id_{i}' for i in range(120)] + ['gone']
+    artist_mgr = spotify_adapter.SpotifyArtistManager(spotify=spotify, max_workers=1)
+    stats = artist_mgr.get_artist_stats(spotify_ids)
+
+    assert [len(each) for each in spotify.calls] == [50, 50, 21]
+    assert len(stats) == 120
+    assert stats[0] == {'spotify_id': 'id_0', 'popularity': 1, 'followers': 2}
+
+
+@pytest.mark.parametrize('tie_break, expected', [
+    ('first', ['id_a1', 'id_b2']),
+    ('popularity', ['id_a2', 'id_b2']),
+])
+def test_drop_dup_artists(tie_break, expected):
+
+    df = pd.DataFrame({'artist_name': ['a', 'a', 'b', 'b', 'a'],
+                       'spotify_id': ['id_a1', 'id_a2', 'id_b1', 'id_b2', 'id_a3'],
+                       'followers': [10, 10, 1, 5, 3],
+                       'popularity': [1, 9, 0, 0, 50]})
+    original = df.copy()
+
+    result = spotify_adapter.SpotifyArtistManager.drop_dup_artists(df, tie_break=tie_break)
+
+    assert result['spotify_id'].tolist() == expected
+    pd.testing.assert_frame_equal(df, original)
+
+
+class FakePlaylistSpotify:
+    """
+        Playlist endpoints over an in-memory track list.
+    """
+
+    def __init__(self, track_ids):
+        self.track_ids = list(track_ids)
+        self.snapshot = 0
+        self.calls = []
+
+    def user_playlist(self, user, playlist_id, fields=None):
+        return {'snapshot_id': f'snap{self.snapshot}'}
+
+    def user_playlist_tracks(self, user, playlist_id, fields=None, limit=100, offset=0):
+        self.calls.append(('tracks', offset))
+        items = [{'track': {'id': each, 'uri': f'spotify:track:{each}'}}
+                 for each in self.track_ids[offset:offset + limit]]
+        return {'total': len(self.track_ids), 'items': items}
+
+    def user_playlist_add_tracks(self, user, playlist_id, tracks):
+        self.calls.append(('add', list(tracks)))
+        self.track_ids.extend(tracks)
+        self.snapshot += 1
+        return {'snapshot_id': f'snap{self.snapshot}'}
+
+    def user_playlist_remove_all_occurrences_of_tracks(self, user, playlist_id, tracks,
+                                                       snapshot_id=None):
+        self.calls.append(('remove', list(tracks), snapshot_id))
+        removed = {each.rsplit(':', 1)[-1] for each in tracks}
+        self.track_ids = [each for each in self.track_ids if each not in removed]
+        self.snapshot += 1
+        return {'snapshot_id': f'snap{self.snapshot}'}
+
+
+def test_sync_playlist_sends_only_delta():
+    spotify = FakePlaylistSpotify(['a', 'b', 'c', 'd', 'e'])
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(spotify=spotify, username='user')
+    playlist_mgr.playlist_id = 'ply'
+
+    result = playlist_mgr.sync_playlist(['a', 'c', 'e', 'f'])
+
+    assert result == {'added': ['f'], 'removed': ['b', 'd'], 'snapshot_id': 'snap2'}
+    assert spotify.calls == [('tracks', 0), ('remove', ['b', 'd'], 'snap0'), ('add', ['f'])]
+    assert spotify.track_ids == ['a', 'c', 'e', 'f']
+
+
+def test_sync_playlist_batches_and_skips_unchanged():
+    spotify = FakePlaylistSpotify([])
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(spotify=spotify, username='user')
+    playlist_mgr.playlist_id = 'ply'
+    desired = [f'id{i}' for i in range(250)]
+
+    playlist_mgr.sync_playlist(desired)
+    assert [len(call[1]) for call in spotify.calls if call[0] == 'add'] == [100, 100, 50]
+
+    spotify.calls = []
+    result = playlist_mgr.sync_playlist(desired)
+    assert spotify.calls == [('tracks', 0), ('tracks', 100), ('tracks', 200)]
+    assert result['added'] == result['removed'] == []
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_iter_playlist_tracks_pages_in_order(max_workers):
+    spotify = FakePlaylistSpotify([f'id{i}' for i in range(250)])
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(spotify=spotify, username='user',
+                                                          max_workers=max_workers)
+    playlist_mgr.playlist_id = 'ply'
+
+    tracks = list(playlist_mgr.iter_playlist_tracks())
+
+    assert [track['id'] for track in tracks] == spotify.track_ids
+    assert tracks[0]['uri'] == 'spotify:track:id0'
+    assert sorted(spotify.calls) == [('tracks', 0), ('tracks', 100), ('tracks', 200)]
+
+
+def test_clear_playlist_removes_every_page():
+    spotify = FakePlaylistSpotify([f'id{i}' for i in range(150)])
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(spotify=spotify, username='user')
+    playlist_mgr.playlist_id = 'ply'
+
+    playlist_mgr.clear_playlist()
+
+    assert spotify.track_ids == []
+
+
+class FakeUserPlaylists(FakePlaylistSpotify):
+    """
+        User playlists over an in-memory name -> id dict.
+    """
+
+    def __init__(self, playlists):
+        super().__init__([])
+        self.playlists = dict(playlists)
+
+    def current_user_playlists(self, limit=50, offset=0):
+        self.calls.append(('playlists', offset))
+        items = [{'name': name, 'id': playlist_id}
+                 for name, playlist_id in list(self.playlists.items())[offset:offset + limit]]
+        more = offset + limit < len(self.playlists)
+        return {'items': items, 'next': 'next' if more else None}
+
+    def user_playlist_create(self, user, name, public=True):
+        self.playlists[name] = f'new_{name}'
+        return {'id': f'new_{name}'}
+
+    def user_playlist(self, user, playlist_id, fields=None):
+        if playlist_id not in self.playlists.values():
+            raise spotify_adapter.SpotifyException(404, -1, 'Not found')
+        return super().user_playlist(user, playlist_id, fields)
+
+
+def test_get_playlist_id_paginates_and_caches(tmp_path):
+    spotify = FakeUserPlaylists({f'name{i}': f'id{i}' for i in range(120)})
+    cache_path = str(tmp_path / 'playlist_ids.json')
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(playlist_name='name60', spotify=spotify,
+                                                          username='user', cache_path=cache_path)
+
+    assert playlist_mgr.get_playlist_id() == 'id60'
+    assert spotify.calls == [('playlists', 0), ('playlists', 50)]
+
+    spotify.calls = []
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(playlist_name='name60', spotify=spotify,
+                                                          username='user', cache_path=cache_path)
+    assert playlist_mgr.get_playlist_id() == 'id60'
+    assert spotify.calls == []
+
+
+def test_get_playlist_id_missing():
+    spotify = FakeUserPlaylists({'other': 'id0'})
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(playlist_name='weekly', spotify=spotify,
+                                                          username='user')
+    with pytest.raises(KeyError):
+        playlist_mgr.get_playlist_id()
+
+    playlist_mgr.create = True
+    assert playlist_mgr.get_playlist_id() == 'new_weekly'
+
+
+def test_stale_playlist_id_resolved_again(tmp_path):
+    cache_path = tmp_path / 'playlist_ids.json'
+    cache_path.write_text('{"weekly": "deleted"}')
+    spotify = FakeUserPlaylists({'weekly': 'id1'})
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(playlist_name='weekly', spotify=spotify,
+                                                          username='user',
+                                                          cache_path=str(cache_path))
+
+    playlist_mgr.get_playlist_id()
+    playlist_mgr.get_snapshot_id()
+
+    assert playlist_mgr.playlist_id == 'id1'
+    assert cache_path.read_text() == '{"weekly": "id1"}'
+
+
+def test_auth_settings_read_on_access(monkeypatch):
+
+    monkeypatch.setenv('SPOTIFY_USERNAME', 'first')
+    assert spotify_adapter.SpotifyAuthManager.username == 'first'
+
+    monkeypatch.setenv('SPOTIFY_USERNAME', 'second')
+    assert spotify_adapter.SpotifyAuthManager().username == 'second'
+
+
+def test_get_spotify_creates_client_once(mocker):
+
+    from app.pipeline import data_collection
+
+    mocker.patch.object(data_collection, 'spotify', None)
+    create = mocker.patch.object(data_collection, 'create_spotify', return_value='client')
+
+    assert data_collection.get_spotify() == 'client'
+    assert data_collection.get_spotify() == 'client'
+    assert create.call_count == 1
+
+
+def test_playlist_mgr_reads_username_lazily(monkeypatch):
+
+    monkeypatch.delenv('SPOTIFY_USERNAME', raising=False)
+    playlist_mgr = spotify_adapter.SpotifyPlaylistManager(spotify=FakePlaylistSpotify([]))
+
+    monkeypatch.setenv('SPOTIFY_USERNAME', 'owner')
+    assert playlist_mgr.username == 'owner'
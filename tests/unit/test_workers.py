@@ -0,0 +1,36 @@
+"""
+    Concurrency helper tests.
+"""
+
+import threading
+import time
+
+from app.pipeline.workers import bounded_map
+
+
+def test_bounded_map_order():
+
+    def slow_square(x):
+        time.sleep(0.01 * (5 - x % 5))
+        return x * x
+
+    assert list(bounded_map(slow_square, range(20), max_workers=4)) == [
+        x * x for x in range(20)]
+
+
+def test_bounded_map_in_flight_limit():
+
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def track(x):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.01)
+        with lock:
+            state['running'] -= 1
+        return x
+
+    assert list(bounded_map(track, range(30), max_workers=8, max_in_flight=3)) == list(range(30))
+    assert state['peak'] <= 3